@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for OpenAlex abstract reconstruction.
+
+Compares the previous two-pass reconstruction with reconstruct_abstract,
+and eager reconstruction of every search hit with lazy PaperRecord.abstract
+when only a fraction of hits survive filtering.
+
+Usage: python benchmarks/bench_abstract.py [--works N] [--survivors FRACTION]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import record
+from sources.openalex import _parse_work, reconstruct_abstract
+
+
+def reconstruct_abstract_two_pass(inverted_index: dict) -> str:
+    """The original implementation: find the max position, then scatter."""
+    if not inverted_index:
+        return ""
+
+    max_pos = 0
+    for positions in inverted_index.values():
+        if positions:
+            max_pos = max(max_pos, max(positions))
+
+    words = [""] * (max_pos + 1)
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            words[pos] = word
+
+    return " ".join(words)
+
+
+def make_inverted_index(rng: random.Random, vocab: list[str]) -> dict:
+    """
+    Build an index shaped like real OpenAlex abstracts.
+
+    Abstracts run 120-350 tokens; word frequencies are heavy-tailed, so a
+    few function words repeat many times and most words appear once.
+    """
+    length = rng.randint(120, 350)
+    index = {}
+    for pos in range(length):
+        rank = min(int(rng.paretovariate(1.1)) - 1, len(vocab) - 1)
+        word = vocab[rank] if rng.random() < 0.6 else vocab[rng.randrange(len(vocab))]
+        index.setdefault(word, []).append(pos)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--works", type=int, default=5000, help="Number of synthetic works")
+    parser.add_argument("--survivors", type=float, default=0.1, help="Fraction of hits whose abstract is read")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = ["the", "of", "and", "a", "to", "in", "we", "flow", "matching", "is"] + [f"word{i}" for i in range(5000)]
+    indexes = [make_inverted_index(rng, vocab) for _ in range(args.works)]
+    works = [
+        {"id": f"https://openalex.org/W{i}", "title": "t", "abstract_inverted_index": index}
+        for i, index in enumerate(indexes)
+    ]
+
+    for index in indexes[:200]:
+        assert reconstruct_abstract(index) == reconstruct_abstract_two_pass(index)
+
+    tokens = sum(sum(map(len, index.values())) for index in indexes)
+    print(f"{args.works} abstracts, {tokens / args.works:.0f} tokens on average\n")
+
+    def best(func) -> float:
+        return min(timeit.repeat(func, number=1, repeat=args.repeat))
+
+    two_pass = best(lambda: [reconstruct_abstract_two_pass(i) for i in indexes])
+    scatter = best(lambda: [reconstruct_abstract(i) for i in indexes])
+    print("Reconstruction of every abstract:")
+    print(f"  two-pass:      {two_pass * 1000:8.1f} ms")
+    print(f"  single-pass:   {scatter * 1000:8.1f} ms  ({two_pass / scatter:.1f}x)")
+
+    survivors = max(1, int(args.works * args.survivors))
+
+    def eager():
+        papers = [_parse_work(w) for w in works]
+        return [reconstruct_abstract_two_pass(p.abstract_index or {}) for p in papers]
+
+    def lazy():
+        record._abstract_cache.clear()
+        papers = [_parse_work(w) for w in works]
+        return [p.abstract for p in papers[:survivors]]
+
+    def lazy_memo():
+        # Same works seen again (another search term, a rerun): served from the memo
+        papers = [_parse_work(w) for w in works]
+        return [p.abstract for p in papers[:survivors]]
+
+    eager_time = best(eager)
+    lazy_time = best(lazy)
+    lazy()
+    memo_time = best(lazy_memo)
+    print(f"\nParse {args.works} hits, read abstracts of {survivors} survivors:")
+    print(f"  eager two-pass:   {eager_time * 1000:8.1f} ms")
+    print(f"  lazy:             {lazy_time * 1000:8.1f} ms  ({eager_time / lazy_time:.1f}x)")
+    print(f"  lazy, memoized:   {memo_time * 1000:8.1f} ms  ({eager_time / memo_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
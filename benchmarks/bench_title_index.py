@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Benchmark for the near-duplicate title index.
+
+Indexes N synthetic titles, then looks up perturbed copies of indexed
+titles (punctuation, LaTeX, hyphenation, case, an added colon clause) and
+fresh titles. Reports build time, lookup time against a pairwise scan, and
+how many perturbed copies each method catches.
+
+Usage: python benchmarks/bench_title_index.py [--titles N] [--queries N] [--threshold T]
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from dedup import normalize_title
+from title_index import TitleIndex, _jaccard, canonical_title, ngrams
+
+TOPICS = [
+    "flow matching", "rectified flow", "diffusion models", "stochastic interpolants",
+    "optimal transport", "normalizing flows", "score matching", "schrodinger bridge",
+    "consistency models", "latent diffusion", "discrete flows", "neural odes"
+]
+
+
+def make_vocab(rng: random.Random, size: int) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = set()
+    while len(vocab) < size:
+        vocab.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 11))))
+    return sorted(vocab)
+
+
+def make_title(rng: random.Random, vocab: list[str], weights: list[float]) -> str:
+    """Title of Zipf-distributed words around one topic phrase, sometimes with a colon clause."""
+    words = rng.choices(vocab, cum_weights=weights, k=rng.randint(3, 9))
+    words.insert(rng.randrange(len(words) + 1), rng.choice(TOPICS))
+    title = " ".join(words).title()
+    if rng.random() < 0.3:
+        title = f"{title}: {' '.join(rng.sample(vocab[:2000], 3)).title()}"
+    return title
+
+
+def perturb(rng: random.Random, title: str) -> str:
+    """A variant a human would still call the same paper."""
+    choice = rng.randrange(5)
+    if choice == 0:
+        return title.lower().replace(" ", "  ", 1) + "."
+    if choice == 1:
+        words = title.split()
+        i = rng.randrange(len(words) - 1)
+        return " ".join(words[:i] + [f"{words[i]}-{words[i + 1]}"] + words[i + 2:])
+    if choice == 2:
+        words = title.split()
+        i = rng.randrange(len(words))
+        words[i] = f"$\\mathcal{{{words[i]}}}$"
+        return " ".join(words)
+    if choice == 3:
+        return title.replace(":", " -", 1) if ":" in title else f"{title}?"
+    return f"{title.split(':')[0]}: Extended Version"
+
+
+def pairwise_find(titles: list[str], grams: list[frozenset[str]], query: str, threshold: float):
+    """Reference: compare the query with every title."""
+    q = ngrams(canonical_title(query))
+    for title, g in zip(titles, grams):
+        if _jaccard(q, g) >= threshold:
+            return title
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=100_000, help="Number of indexed titles")
+    parser.add_argument("--queries", type=int, default=2000, help="Perturbed and fresh lookups each")
+    parser.add_argument("--pairwise-queries", type=int, default=20, help="Lookups timed with the pairwise scan")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocab = make_vocab(rng, 20_000)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocab) + 1)))
+    titles = list(dict.fromkeys(make_title(rng, vocab, weights) for _ in range(args.titles)))
+    perturbed = [perturb(rng, title) for title in rng.sample(titles, args.queries)]
+    fresh = [make_title(rng, vocab, weights) for _ in range(args.queries)]
+    fresh = [t for t in fresh if t not in set(titles)]
+    print(f"{len(titles)} titles, {len(perturbed)} perturbed and {len(fresh)} fresh lookups\n")
+
+    started = time.perf_counter()
+    index = TitleIndex(titles, threshold=args.threshold)
+    build = time.perf_counter() - started
+    exact = {normalize_title(t) for t in titles}
+    print(f"Build: {build:.2f} s")
+
+    started = time.perf_counter()
+    caught = sum(1 for t in perturbed if index.find(t) is not None)
+    false_hits = sum(1 for t in fresh if index.find(t) is not None)
+    per_query = (time.perf_counter() - started) / (len(perturbed) + len(fresh))
+
+    exact_caught = sum(1 for t in perturbed if normalize_title(t) in exact)
+
+    grams = [ngrams(canonical_title(t)) for t in titles]
+    sample = perturbed[:args.pairwise_queries]
+    started = time.perf_counter()
+    for t in sample:
+        pairwise_find(titles, grams, t, args.threshold)
+    pairwise_per_query = (time.perf_counter() - started) / len(sample)
+
+    print(f"\nLookup (threshold {args.threshold}):")
+    print(f"  pairwise scan:  {pairwise_per_query * 1000:9.2f} ms/query")
+    print(f"  index:          {per_query * 1000:9.3f} ms/query  ({pairwise_per_query / per_query:.0f}x)")
+    print("\nPerturbed copies caught:")
+    print(f"  exact normalized title:  {exact_caught / len(perturbed):6.1%}")
+    print(f"  near-duplicate index:    {caught / len(perturbed):6.1%}")
+    print(f"Fresh titles flagged:      {false_hits / len(fresh):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
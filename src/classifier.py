@@ -3,9 +3,12 @@ from __future__ import annotations
 
 import json
 import os
-import urllib.request
 from typing import Optional
 
+import transport
+from record import PaperRecord
+from run_budget import BudgetExceededError
+
 
 CATEGORIES = [
     ("Foundational", "Core flow matching methodology, frameworks, and general techniques"),
@@ -28,6 +31,9 @@ def classify_paper(title: str, abstract: str, api_key: Optional[str] = None) ->
 
     Returns:
         Category name
+
+    Raises:
+        BudgetExceededError: The run's deadline or OpenAI request budget is used up
     """
     api_key = api_key or os.environ.get("OPENAI_API_KEY")
 
@@ -59,16 +65,16 @@ Respond with ONLY the category name (e.g., "Foundational" or "Theory"), nothing
             "max_tokens": 20
         }
 
-        req = urllib.request.Request(
+        with transport.request(
             "https://api.openai.com/v1/chat/completions",
             data=json.dumps(data).encode("utf-8"),
             headers={
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {api_key}"
-            }
-        )
-
-        with urllib.request.urlopen(req, timeout=30) as response:
+            },
+            timeout=30,
+            source="openai"
+        ) as response:
             result = json.loads(response.read().decode("utf-8"))
             category = result["choices"][0]["message"]["content"].strip()
 
@@ -83,17 +89,19 @@ Respond with ONLY the category name (e.g., "Foundational" or "Theory"), nothing
                         return valid
                 return "Applications"  # Default fallback
 
+    except BudgetExceededError:
+        raise
     except Exception as e:
         print(f"Error classifying paper: {e}")
         return "Applications"
 
 
-def classify_papers_batch(papers: list[dict], api_key: Optional[str] = None) -> dict[str, str]:
+def classify_papers_batch(papers: list[PaperRecord], api_key: Optional[str] = None) -> dict[str, str]:
     """
     Classify multiple papers.
 
     Args:
-        papers: List of dicts with 'arxiv_id', 'title', 'abstract'
+        papers: List of PaperRecord objects
         api_key: OpenAI API key
 
     Returns:
@@ -102,12 +110,12 @@ def classify_papers_batch(papers: list[dict], api_key: Optional[str] = None) ->
     results = {}
     for paper in papers:
         category = classify_paper(
-            paper["title"],
-            paper.get("abstract", ""),
+            paper.title,
+            paper.abstract,
             api_key
         )
-        results[paper["arxiv_id"]] = category
-        print(f"  Classified '{paper['title'][:50]}...' as {category}")
+        results[paper.arxiv_id] = category
+        print(f"  Classified '{paper.title[:50]}...' as {category}")
 
     return results
 
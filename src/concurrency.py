@@ -0,0 +1,76 @@
+"""Per-host concurrency limits for running blocking source calls under asyncio."""
+from __future__ import annotations
+
+import asyncio
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+@dataclass(frozen=True)
+class HostLimit:
+    """Concurrency limit and politeness interval for one API host."""
+    max_concurrent: int = 2
+    min_interval: float = 0.0  # Seconds between request starts
+
+
+# Defaults mirror the sleeps the sequential pipeline used to do between calls
+HOST_LIMITS = {
+    "api.openalex.org": HostLimit(max_concurrent=4, min_interval=0.1),
+    "export.arxiv.org": HostLimit(max_concurrent=1, min_interval=3.0),
+    "oaipmh.arxiv.org": HostLimit(max_concurrent=1, min_interval=3.0),
+    "api.semanticscholar.org": HostLimit(max_concurrent=1, min_interval=1.0),
+}
+
+DEFAULT_LIMIT = HostLimit()
+
+
+class _HostSlot:
+    """Semaphore plus start-time spacing for a single host on one event loop."""
+
+    def __init__(self, limit: HostLimit):
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit.max_concurrent)
+        self.spacing_lock = asyncio.Lock()
+        self.last_start = 0.0
+
+    async def wait_turn(self) -> None:
+        """Sleep until min_interval has passed since the previous request start."""
+        if self.limit.min_interval <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.spacing_lock:
+            delay = self.last_start + self.limit.min_interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last_start = loop.time()
+
+
+# Semaphores are bound to the loop they are first used on, so keep one set per loop
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, _HostSlot]]" = weakref.WeakKeyDictionary()
+
+
+def _get_slot(host: str) -> _HostSlot:
+    loop = asyncio.get_running_loop()
+    loop_slots = _slots.setdefault(loop, {})
+    if host not in loop_slots:
+        loop_slots[host] = _HostSlot(HOST_LIMITS.get(host, DEFAULT_LIMIT))
+    return loop_slots[host]
+
+
+async def run_blocking(host: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking source call in a worker thread behind the host's limits.
+
+    Args:
+        host: API host the call talks to (key into HOST_LIMITS)
+        func: Blocking function to run
+        *args, **kwargs: Passed through to func
+
+    Returns:
+        Whatever func returns
+    """
+    slot = _get_slot(host)
+    async with slot.semaphore:
+        await slot.wait_turn()
+        return await asyncio.to_thread(func, *args, **kwargs)
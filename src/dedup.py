@@ -1,21 +1,35 @@
 """Deduplication module - parses original repo README to find existing papers."""
 from __future__ import annotations
 
-import re
-import urllib.request
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Optional, Union
 
+from http_cache import cached_fetch
+from readme_index import SCANNER_VERSION, normalize_title, scan_readme
+from record import PaperRecord, canonical_arxiv_id
+from store import PaperStore, title_hash
+from title_index import TitleIndex
 
-def fetch_original_readme(url: str) -> str:
-    """Fetch the README from the original repository."""
-    try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
 
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return response.read().decode("utf-8")
+# Parsed indexes kept per README directory (older contents are pruned)
+PARSED_INDEX_KEEP = 4
+
+
+def _fetch_readme_bytes(url: str) -> bytes:
+    try:
+        return cached_fetch(url, source="readme", timeout=30)
     except Exception as e:
         print(f"Error fetching original README: {e}")
-        return ""
+        return b""
+
+
+def fetch_original_readme(url: str) -> str:
+    """Fetch the README from the original repository."""
+    return _fetch_readme_bytes(url).decode("utf-8")
 
 
 def extract_arxiv_ids(readme_content: str) -> set[str]:
@@ -30,24 +44,7 @@ def extract_arxiv_ids(readme_content: str) -> set[str]:
     Returns:
         Set of arXiv IDs (without version suffix)
     """
-    arxiv_ids = set()
-
-    # Pattern for arxiv.org URLs
-    url_pattern = r'arxiv\.org/(?:abs|pdf)/(\d{4}\.\d{4,5})'
-    for match in re.finditer(url_pattern, readme_content):
-        arxiv_id = match.group(1)
-        # Remove version suffix if present
-        arxiv_id = arxiv_id.split("v")[0]
-        arxiv_ids.add(arxiv_id)
-
-    # Pattern for arXiv:XXXX.XXXXX format
-    arxiv_pattern = r'arXiv[:\s]+(\d{4}\.\d{4,5})'
-    for match in re.finditer(arxiv_pattern, readme_content, re.IGNORECASE):
-        arxiv_id = match.group(1)
-        arxiv_id = arxiv_id.split("v")[0]
-        arxiv_ids.add(arxiv_id)
-
-    return arxiv_ids
+    return scan_readme(readme_content).arxiv_ids
 
 
 def extract_paper_titles(readme_content: str) -> set[str]:
@@ -59,29 +56,15 @@ def extract_paper_titles(readme_content: str) -> set[str]:
     Returns:
         Set of normalized paper titles (lowercase, stripped)
     """
-    titles = set()
-
-    # Pattern for bold titles
-    title_pattern = r'\*\*([^*]+)\*\*'
-    for match in re.finditer(title_pattern, readme_content):
-        title = match.group(1).strip()
-        # Normalize: lowercase and remove extra whitespace
-        normalized = " ".join(title.lower().split())
-        titles.add(normalized)
-
-    return titles
-
-
-def normalize_title(title: str) -> str:
-    """Normalize a title for comparison."""
-    return " ".join(title.lower().split())
+    return scan_readme(readme_content).titles
 
 
 def is_duplicate(
     arxiv_id: str,
     title: str,
     existing_arxiv_ids: set[str],
-    existing_titles: set[str]
+    existing_titles: set[str],
+    title_index: Optional[TitleIndex] = None
 ) -> bool:
     """
     Check if a paper is a duplicate.
@@ -91,12 +74,14 @@ def is_duplicate(
         title: The paper's title
         existing_arxiv_ids: Set of arXiv IDs from original repo
         existing_titles: Set of normalized titles from original repo
+        title_index: Optional near-duplicate index of the existing titles,
+            consulted when there is no exact match
 
     Returns:
         True if the paper is a duplicate
     """
     # Clean arXiv ID
-    clean_id = arxiv_id.split("v")[0] if arxiv_id else ""
+    clean_id = canonical_arxiv_id(arxiv_id)
 
     # Check arXiv ID match
     if clean_id and clean_id in existing_arxiv_ids:
@@ -107,28 +92,149 @@ def is_duplicate(
     if normalized_title in existing_titles:
         return True
 
+    # Check near-duplicate title (punctuation, LaTeX, hyphenation, long colon-clause heads)
+    if title_index is not None and title_index.find(title) is not None:
+        return True
+
     return False
 
 
-def load_existing_papers(readme_url: str) -> tuple[set[str], set[str]]:
+def load_parsed_readme(content: bytes, index_dir: Optional[Union[str, Path]] = None) -> tuple[set[str], set[str]]:
+    """
+    Return a README's arXiv IDs and titles, reusing a saved parse of the same bytes.
+
+    Parses are saved in index_dir as <sha256 of content>-v<SCANNER_VERSION>.json,
+    so an unchanged README is loaded from disk without scanning it again,
+    and a scanner change invalidates every saved parse.
+
+    Args:
+        content: README bytes
+        index_dir: Directory of saved parses (None to always scan)
+
+    Returns:
+        Tuple of (arxiv_ids, titles)
+    """
+    if not index_dir or not content:
+        index = scan_readme(content)
+        return index.arxiv_ids, index.titles
+
+    index_dir = Path(index_dir)
+    path = index_dir / f"{hashlib.sha256(content).hexdigest()}-v{SCANNER_VERSION}.json"
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+        os.utime(path)  # Mark as recently used
+        return set(saved["arxiv_ids"]), set(saved["titles"])
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+
+    index = scan_readme(content)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    # Uniquely named, so processes saving the same parse never write one temp file
+    with tempfile.NamedTemporaryFile("w", dir=index_dir, suffix=".tmp", delete=False) as f:
+        json.dump({"arxiv_ids": sorted(index.arxiv_ids), "titles": sorted(index.titles)}, f, ensure_ascii=False)
+    os.replace(f.name, path)
+
+    for stale in sorted(index_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)[PARSED_INDEX_KEEP:]:
+        stale.unlink(missing_ok=True)
+
+    return index.arxiv_ids, index.titles
+
+
+def load_existing_papers(readme_url: str, index_dir: Optional[Union[str, Path]] = None) -> tuple[set[str], set[str]]:
     """
     Load existing papers from the original repository.
 
+    The README comes through the HTTP cache, which revalidates it with a
+    conditional GET; an unchanged README then costs one 304 and its saved
+    parse is loaded from index_dir.
+
     Args:
         readme_url: URL to the raw README file
+        index_dir: Directory of saved README parses (None to always scan)
 
     Returns:
         Tuple of (arxiv_ids, titles)
     """
-    content = fetch_original_readme(readme_url)
-    arxiv_ids = extract_arxiv_ids(content)
-    titles = extract_paper_titles(content)
+    arxiv_ids, titles = load_parsed_readme(_fetch_readme_bytes(readme_url), index_dir)
 
     print(f"Found {len(arxiv_ids)} arXiv IDs and {len(titles)} titles in original repo")
 
     return arxiv_ids, titles
 
 
+def load_store_matches(store: PaperStore, papers: Iterable[PaperRecord]) -> tuple[set[str], set[str]]:
+    """
+    Look up candidate papers among those the local store already lists.
+
+    Uses the store's indexes on arXiv ID and title hash, so the cost scales
+    with the number of candidates rather than the size of the list.
+
+    Args:
+        store: Local paper store
+        papers: Candidate papers
+
+    Returns:
+        Tuple of (arxiv_ids, titles) of candidates that are already listed,
+        in the same form as load_existing_papers
+    """
+    papers = list(papers)
+    arxiv_ids = store.listed_ids(p.arxiv_id for p in papers if p.arxiv_id)
+    listed_hashes = store.listed_title_hashes(p.title for p in papers)
+    titles = {normalize_title(p.title) for p in papers if title_hash(p.title) in listed_hashes}
+    return arxiv_ids, titles
+
+
+class DedupIndex:
+    """
+    Everything a candidate is checked against: the original list and papers already listed here.
+
+    Built once before fetching, so candidates that are already listed can
+    be dropped before any per-paper lookup (citations, details,
+    classification) is paid for.
+    """
+
+    def __init__(
+        self,
+        arxiv_ids: set[str],
+        titles: set[str],
+        title_index: Optional[TitleIndex] = None,
+        store: Optional[PaperStore] = None
+    ):
+        """
+        Args:
+            arxiv_ids: arXiv IDs of the original list
+            titles: Normalized titles of the original list
+            title_index: Near-duplicate index of every listed title
+            store: Local store, asked about each batch of candidates
+        """
+        self.arxiv_ids = arxiv_ids
+        self.titles = titles
+        self.title_index = title_index
+        self.store = store
+
+    def split(self, papers: Iterable[PaperRecord]) -> tuple[list[PaperRecord], list[PaperRecord]]:
+        """
+        Split candidates into new papers and duplicates of listed ones.
+
+        Returns:
+            Tuple of (new, duplicates), each in input order
+        """
+        papers = list(papers)
+        arxiv_ids, titles = self.arxiv_ids, self.titles
+        if self.store is not None and papers:
+            local_ids, local_titles = load_store_matches(self.store, papers)
+            arxiv_ids, titles = arxiv_ids | local_ids, titles | local_titles
+
+        new, duplicates = [], []
+        for paper in papers:
+            if is_duplicate(paper.arxiv_id, paper.title, arxiv_ids, titles, self.title_index):
+                duplicates.append(paper)
+            else:
+                new.append(paper)
+        return new, duplicates
+
+
 def load_local_readme(readme_path: str) -> tuple[set[str], set[str]]:
     """
     Load existing papers from a local README file.
@@ -140,12 +246,10 @@ def load_local_readme(readme_path: str) -> tuple[set[str], set[str]]:
         Tuple of (arxiv_ids, titles)
     """
     try:
-        with open(readme_path, "r") as f:
-            content = f.read()
-        arxiv_ids = extract_arxiv_ids(content)
-        titles = extract_paper_titles(content)
-        print(f"Found {len(arxiv_ids)} arXiv IDs and {len(titles)} titles in local README")
-        return arxiv_ids, titles
+        with open(readme_path, "rb") as f:
+            index = scan_readme(f.read())
+        print(f"Found {len(index.arxiv_ids)} arXiv IDs and {len(index.titles)} titles in local README")
+        return index.arxiv_ids, index.titles
     except FileNotFoundError:
         print("Local README not found, starting fresh")
         return set(), set()
@@ -0,0 +1,235 @@
+"""Cross-source entity resolution - joins records of the same paper on DOI, arXiv ID and title."""
+from __future__ import annotations
+
+import dataclasses
+import re
+from collections import Counter
+from typing import Iterable, Optional
+
+from record import PaperRecord, canonical_arxiv_id
+from title_index import canonical_title
+
+# Lower number wins when two records of one paper disagree on a field
+SOURCE_PRIORITY = {"openalex": 0, "arxiv": 1, "semantic_scholar": 2}
+
+# Citation index each source's counts come from (arXiv candidates are
+# counted through OpenAlex lookups of their arXiv DOI)
+CITATION_PROVIDER = {"openalex": "openalex", "arxiv": "openalex", "semantic_scholar": "semantic_scholar"}
+
+# Shorter canonical titles ("introduction", "flow matching") are too generic to join on
+MIN_TITLE_KEY_CHARS = 20
+
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:)", re.IGNORECASE)
+_ARXIV_DOI = "10.48550/arxiv."
+
+
+def normalize_doi(doi: Optional[str]) -> str:
+    """Bare lowercase DOI ("https://doi.org/10.1/X" -> "10.1/x"), or ""."""
+    return _DOI_PREFIX.sub("", (doi or "").strip()).lower()
+
+
+def _arxiv_id_of(record: PaperRecord, doi: str) -> str:
+    if record.arxiv_id:
+        return record.arxiv_id
+    return canonical_arxiv_id(doi[len(_ARXIV_DOI):]) if doi.startswith(_ARXIV_DOI) else ""
+
+
+def _is_arxiv_venue(venue: str) -> bool:
+    return not venue or "arxiv" in venue.lower()
+
+
+class EntityResolver:
+    """
+    Groups records from every source into one entity per paper.
+
+    Each record is joined to earlier ones through a hash table per key
+    (normalized DOI, canonical arXiv ID, canonical title), with union-find
+    over the matches, so resolving n records is linear in n. Two groups
+    carrying different arXiv IDs are never joined, whatever else matches:
+    separate preprints stay separate papers.
+
+    resolve() builds one PaperRecord per entity:
+
+    - Base record (title, source, source_id): the highest-priority source
+      in SOURCE_PRIORITY, most cited first within a source.
+    - Authors and abstract: from the base record, else the next record
+      that has them.
+    - Venue, DOI and publication date: from the published version (the
+      first record whose venue is not arXiv), else the base record.
+    - arXiv submission date and categories: from the arXiv record.
+    - Citations: summed over distinct works within one citation index
+      (OpenAlex often splits the preprint and the conference version),
+      then the highest index wins, so the same work is never counted
+      twice through two indexes.
+    - Matched terms: the union, in order.
+    """
+
+    def __init__(self):
+        self._records: list[PaperRecord] = []
+        self._parent: list[int] = []
+        self._arxiv_ids: list[str] = []  # The group's arXiv ID, kept at its root
+        self._keys: dict[tuple[str, str], int] = {}
+        self.joins: Counter = Counter()  # Records joined to an earlier group, by key kind
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, arxiv_id: str) -> bool:
+        return ("arxiv", arxiv_id) in self._keys
+
+    def add(self, record: PaperRecord) -> None:
+        """Join a record to the entities seen so far."""
+        doi = normalize_doi(record.doi)
+        arxiv_id = _arxiv_id_of(record, doi)
+        title = canonical_title(record.title)
+        keys = [("doi", doi), ("arxiv", arxiv_id)]
+        if len(title) >= MIN_TITLE_KEY_CHARS:
+            keys.append(("title", title))
+
+        entry = len(self._records)
+        self._records.append(record)
+        self._parent.append(entry)
+        self._arxiv_ids.append(arxiv_id)
+
+        joined_by = ""
+        for key in keys:
+            if not key[1]:
+                continue
+            other = self._keys.get(key)
+            if other is None:
+                self._keys[key] = entry
+            elif self._union(entry, other) and not joined_by:
+                joined_by = key[0]
+        if joined_by:
+            self.joins[joined_by] += 1
+
+    def add_all(self, records: Iterable[PaperRecord]) -> None:
+        for record in records:
+            self.add(record)
+
+    def _find(self, entry: int) -> int:
+        parent = self._parent
+        root = entry
+        while parent[root] != root:
+            root = parent[root]
+        while parent[entry] != root:
+            parent[entry], entry = root, parent[entry]
+        return root
+
+    def _union(self, a: int, b: int) -> bool:
+        """Join two groups unless their arXiv IDs conflict. Returns True if they are now one group."""
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return True
+        id_a, id_b = self._arxiv_ids[a], self._arxiv_ids[b]
+        if id_a and id_b and id_a != id_b:
+            return False
+        # The earlier record stays root, so keys keep pointing at a live group
+        root, child = min(a, b), max(a, b)
+        self._parent[child] = root
+        self._arxiv_ids[root] = id_a or id_b
+        return True
+
+    def _grouped(self) -> dict[int, list[PaperRecord]]:
+        grouped: dict[int, list[PaperRecord]] = {}
+        for entry, record in enumerate(self._records):
+            grouped.setdefault(self._find(entry), []).append(record)
+        return grouped
+
+    def groups(self) -> list[list[PaperRecord]]:
+        """Records per entity, in order of each entity's first record."""
+        return list(self._grouped().values())
+
+    def resolve(self) -> list[PaperRecord]:
+        """
+        One merged PaperRecord per entity that has an arXiv ID.
+
+        Entities without one (a conference version no source linked to a
+        preprint) are dropped, as the list only links arXiv papers.
+        """
+        resolved = []
+        for root, records in self._grouped().items():
+            arxiv_id = self._arxiv_ids[root]
+            if arxiv_id:
+                resolved.append(merge_records(records, arxiv_id))
+        return resolved
+
+
+def _citation_count(records: list[PaperRecord]) -> int:
+    per_work: dict[tuple[str, str], int] = {}
+    for record in records:
+        provider = CITATION_PROVIDER.get(record.source, record.source)
+        work = record.source_id if record.source != "arxiv" else f"arxiv:{record.arxiv_id}"
+        key = (provider, work or str(id(record)))
+        per_work[key] = max(per_work.get(key, 0), record.citation_count)
+
+    per_provider: Counter = Counter()
+    for (provider, _), count in per_work.items():
+        per_provider[provider] += count
+    return max(per_provider.values(), default=0)
+
+
+def merge_records(records: list[PaperRecord], arxiv_id: str = "") -> PaperRecord:
+    """
+    Merge records of one paper into a new PaperRecord (field rules in EntityResolver).
+
+    Args:
+        records: Records of the same paper, from any sources
+        arxiv_id: The entity's arXiv ID (default: the first record's that has one)
+
+    Returns:
+        Merged PaperRecord (the inputs are left unchanged)
+    """
+    ordered = sorted(records, key=lambda r: (SOURCE_PRIORITY.get(r.source, len(SOURCE_PRIORITY)), -r.citation_count))
+    base = ordered[0]
+    merged = dataclasses.replace(base, arxiv_id=arxiv_id or next((r.arxiv_id for r in ordered if r.arxiv_id), ""))
+    if len(ordered) == 1:
+        return merged
+
+    if not merged.authors:
+        merged.authors = next((r.authors for r in ordered if r.authors), ())
+    if not (merged.abstract_text or merged.abstract_index):
+        donor = next((r for r in ordered if r.abstract_text or r.abstract_index), None)
+        if donor:
+            merged.abstract_text, merged.abstract_index = donor.abstract_text, donor.abstract_index
+
+    published = next((r for r in ordered if not _is_arxiv_venue(r.venue)), None)
+    if published:
+        merged.venue = published.venue
+        merged.doi = published.doi or merged.doi
+        merged.publication_date = published.publication_date or merged.publication_date
+
+    preprint = next((r for r in ordered if r.source == "arxiv"), None)
+    if preprint:
+        merged.published_date = preprint.published_date
+        merged.categories = preprint.categories
+
+    merged.updated_date = max((r.updated_date for r in ordered if r.updated_date), default=None)
+    merged.year = min((r.year for r in ordered if r.year), default=0)
+    merged.citation_count = _citation_count(ordered)
+    merged.matched_terms = tuple(dict.fromkeys(t for r in records for t in r.matched_terms))
+    return merged
+
+
+if __name__ == "__main__":
+    # Test resolving a preprint, its conference version and an S2 record
+    resolver = EntityResolver()
+    resolver.add_all([
+        PaperRecord(
+            title="Flow Matching for Generative Modeling", arxiv_id="2210.02747", citation_count=900,
+            venue="arXiv (Cornell University)", doi="https://doi.org/10.48550/arxiv.2210.02747",
+            source="openalex", source_id="W1"
+        ),
+        PaperRecord(
+            title="Flow Matching for Generative Modeling", citation_count=600, venue="ICLR",
+            source="openalex", source_id="W2"
+        ),
+        PaperRecord(
+            title="Flow matching for generative modeling.", citation_count=1400,
+            doi="10.48550/arXiv.2210.02747", source="semantic_scholar", source_id="S1"
+        ),
+        PaperRecord(title="Rectified Flow", arxiv_id="2209.03003", citation_count=500, source="arxiv"),
+    ])
+    for paper in resolver.resolve():
+        print(f"{paper.arxiv_id}: {paper.title} ({paper.venue}, {paper.citation_count} citations)")
+    print(f"{len(resolver)} records, joins: {dict(resolver.joins)}")
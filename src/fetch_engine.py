@@ -0,0 +1,336 @@
+"""Async fetch engine - queries all paper sources concurrently."""
+from __future__ import annotations
+
+import asyncio
+import math
+import sys
+from datetime import datetime
+from typing import Optional
+
+from dedup import DedupIndex
+from entity_resolution import EntityResolver
+from query_planner import matching_terms, plan_queries, tag_matches
+from record import PaperRecord
+from refresh import RefreshScheduler
+from run_budget import get_budget
+from sources.arxiv import search_arxiv_async, search_arxiv_windows_async
+from sources.arxiv_oai import harvest_arxiv_oai_async
+from sources.openalex import (
+    CITATION_BATCH_SIZE,
+    SEARCH_FIELDS,
+    fetch_openalex_details,
+    get_citation_counts_openalex_async,
+    search_openalex_async
+)
+from sources.semantic_scholar import search_semantic_scholar_bulk_async
+from watermarks import Watermarks
+
+# Start of the arXiv history harvested on a full rescan (the other sources search from 2020 too)
+FULL_HISTORY_FROM = datetime(2020, 1, 1)
+
+
+def _since_str(watermarks: Optional[Watermarks], source: str) -> Optional[str]:
+    since = watermarks.since(source) if watermarks else None
+    return since.date().isoformat() if since else None
+
+
+async def _openalex_query(
+    terms: tuple[str, ...],
+    min_citations: int,
+    resolver: EntityResolver,
+    watermarks: Optional[Watermarks]
+) -> None:
+    oa_papers = await search_openalex_async(
+        list(terms),
+        # Same 200-per-term allowance as separate queries; overlapping hits are only paid for once
+        limit=200 * len(terms),
+        min_citation_count=min_citations,
+        year_from=2020,
+        from_updated_date=_since_str(watermarks, "openalex"),
+        select=SEARCH_FIELDS
+    )
+    label = " | ".join(f"'{term}'" for term in terms)
+    print(f"  [OpenAlex] {label}: {len(oa_papers)} papers with {min_citations}+ citations")
+
+    for paper in oa_papers:
+        if watermarks:
+            watermarks.observe("openalex", paper.updated_date)
+        # Works without an arXiv location are kept: they may be the published
+        # version of a preprint and join it by DOI or title
+        tag_matches(paper, terms)
+        resolver.add(paper)
+
+
+async def _arxiv_recent(
+    search_terms: list[str],
+    min_citations: int,
+    resolver: EntityResolver,
+    openalex_done: asyncio.Future,
+    watermarks: Optional[Watermarks],
+    backfill_from: Optional[datetime] = None,
+    scheduler: Optional[RefreshScheduler] = None,
+    dedup_index: Optional[DedupIndex] = None
+) -> None:
+    if backfill_from:
+        arxiv_papers = await harvest_arxiv_oai_async(search_terms, backfill_from)
+        print(f"  [arXiv] OAI-PMH backfill since {backfill_from:%Y-%m-%d}: {len(arxiv_papers)} matching papers")
+    elif watermarks and not watermarks.since("arxiv"):
+        # Full rescan (or first run): the whole history, one submittedDate window per month,
+        # newest first. Finished windows are kept across partial runs and skipped, so a
+        # history larger than one run's request budget completes over several runs.
+        until = datetime.utcnow()
+        done = watermarks.history_done("arxiv")
+
+        def window_done(start: datetime, end: datetime) -> None:
+            if end < until:  # The current month is still filling up
+                watermarks.complete_window("arxiv", start)
+
+        arxiv_papers = await search_arxiv_windows_async(
+            search_terms, FULL_HISTORY_FROM, until, skip=done, on_window_done=window_done
+        )
+        print(
+            f"  [arXiv] Full history since {FULL_HISTORY_FROM:%Y-%m-%d}: {len(arxiv_papers)} papers"
+            + (f" ({len(done)} windows done in earlier runs)" if done else "")
+        )
+    else:
+        since = watermarks.since("arxiv") if watermarks else None
+        date_range = (since, datetime.utcnow()) if since else None
+        arxiv_papers = await search_arxiv_async(search_terms, max_results=200, date_range=date_range)
+        print(f"  [arXiv] Found {len(arxiv_papers)} recent papers")
+
+    terms = tuple(search_terms)
+    for paper in arxiv_papers:
+        tag_matches(paper, terms)
+        if watermarks:
+            watermarks.observe("arxiv", paper.published_date)
+
+    # Let OpenAlex finish first so we don't spend lookups on papers it already returned
+    await openalex_done
+
+    papers_to_check = {}
+    for paper in arxiv_papers:
+        if paper.arxiv_id and paper.arxiv_id not in resolver:
+            papers_to_check.setdefault(paper.arxiv_id, paper)
+
+    if scheduler:
+        # Earlier runs' candidates still below the threshold are rechecked alongside the new arrivals
+        stored = [p for p in scheduler.stored_candidates() if p.arxiv_id not in resolver]
+        new_arrivals = len(papers_to_check)
+        for paper in stored:
+            papers_to_check.setdefault(paper.arxiv_id, paper)
+        print(
+            f"  [arXiv] {new_arrivals} new arrivals, "
+            f"{len(papers_to_check) - new_arrivals} stored candidates below threshold"
+        )
+
+    if dedup_index is not None:
+        # Already-listed papers would be dropped by dedup anyway; don't pay to look them up
+        candidates, listed = dedup_index.split(papers_to_check.values())
+        if listed:
+            avoided = (
+                math.ceil(len(papers_to_check) / CITATION_BATCH_SIZE) - math.ceil(len(candidates) / CITATION_BATCH_SIZE)
+            )
+            print(f"  [arXiv] {len(listed)} papers already listed, not looked up (up to {avoided} citation requests avoided)")
+        papers_to_check = {paper.arxiv_id: paper for paper in candidates}
+
+    if scheduler:
+        plan = scheduler.plan(list(papers_to_check.values()))
+        to_lookup = plan.refresh
+        skipped = ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in plan.skipped.items())
+        print(
+            f"  [arXiv] {len(papers_to_check)} candidates: {len(plan.known_above)} already above threshold, "
+            f"{len(to_lookup)} to refresh" + (f", skipped {skipped}" if skipped else "")
+        )
+        for paper, state in plan.known_above:
+            paper.citation_count = state.citation_count
+            paper.venue = sys.intern(state.venue)
+            resolver.add(paper)
+    else:
+        to_lookup = list(papers_to_check.values())
+        print(f"  [arXiv] Checking citations for {len(to_lookup)} new papers...")
+
+    # Lookups go out in to_lookup order, so the scheduler's priorities are served first
+    checked = set()
+    citations = await get_citation_counts_openalex_async([p.arxiv_id for p in to_lookup], checked=checked)
+    print(f"  [arXiv] OpenAlex resolved {len(citations)}/{len(to_lookup)} IDs")
+    if len(checked) < len(to_lookup):
+        print(f"  [arXiv] {len(to_lookup) - len(checked)} lookups failed or were cut by the run budget")
+    if scheduler:
+        # Only papers whose batch was answered count as checked
+        scheduler.record([p for p in to_lookup if p.arxiv_id in checked], citations)
+        scheduler.defer(plan.deferred + [p for p in to_lookup if p.arxiv_id not in checked])
+
+    for paper in to_lookup:
+        details = citations.get(paper.arxiv_id)
+        if not details:
+            continue
+        citation_count = details.get("citation_count", 0)
+
+        # Apply citation filter
+        if citation_count >= min_citations:
+            paper.citation_count = citation_count
+            paper.venue = sys.intern(details.get("venue", "") or "")
+            resolver.add(paper)
+            print(f"  [arXiv] {paper.title[:40]}... ({citation_count} citations) ✓")
+
+
+async def _semantic_scholar_query(
+    terms: tuple[str, ...],
+    min_citations: int,
+    resolver: EntityResolver
+) -> None:
+    label = " | ".join(f"'{term}'" for term in terms)
+    # No publication-date watermark here: with minCitationCount applied by the
+    # server, papers published since the mark have rarely reached it yet, and
+    # older papers crossing it later would never be found. The bulk search
+    # pages only through papers above the threshold, so it stays cheap.
+    try:
+        ss_papers = await search_semantic_scholar_bulk_async(
+            list(terms),
+            min_citation_count=min_citations,
+            year_from=2020
+        )
+    except Exception as e:
+        print(f"  [Semantic Scholar] {label} error: {e}")
+        return
+    print(f"  [Semantic Scholar] {label}: {len(ss_papers)} papers")
+
+    for paper in ss_papers:
+        # Papers without an ArXiv external ID can still join one by DOI or title
+        tag_matches(paper, terms)
+        resolver.add(paper)
+
+
+async def fetch_all_papers_async(
+    config: dict,
+    all_papers: Optional[dict[str, PaperRecord]] = None,
+    watermarks: Optional[Watermarks] = None,
+    backfill_from: Optional[datetime] = None,
+    scheduler: Optional[RefreshScheduler] = None,
+    dedup_index: Optional[DedupIndex] = None
+) -> list[PaperRecord]:
+    """
+    Fetch papers from OpenAlex, arXiv and Semantic Scholar concurrently.
+
+    The search terms are first compiled by query_planner into as few
+    queries per source as its API allows (OR'd OpenAlex filters, one
+    combined arXiv query, one Semantic Scholar bulk search), and every
+    query runs as its own task; per-host limits in concurrency.HOST_LIMITS
+    keep each API within its politeness budget. Every record goes into an
+    EntityResolver as its task finishes, and once all tasks are done the
+    records are resolved into one entity per paper: joined on DOI, arXiv
+    ID and title, with per-field source rules and split citation counts
+    summed (see entity_resolution). Each record's matched_terms says which
+    search terms found it.
+
+    With watermarks, OpenAlex and arXiv only ask for records newer than
+    their mark (from_updated_date, submittedDate) and the marks advance to
+    the newest dates seen. Semantic Scholar has no watermark: its server-side
+    citation filter would hide the recent papers a publication-date mark
+    selects.
+
+    Args:
+        config: Loaded config.yaml
+        all_papers: Optional dict (arxiv_id -> PaperRecord) to write the resolved papers into
+        watermarks: Optional per-source high-water marks for incremental runs
+        backfill_from: Harvest arXiv via OAI-PMH from this date instead of
+            using the search API (for rebuilding the full candidate set)
+        scheduler: Decides which arXiv candidates get a citation lookup
+            (None looks up every candidate)
+        dedup_index: Papers already listed; arXiv candidates found in it
+            are dropped before their citation lookup
+
+    Returns:
+        List of PaperRecord objects, one per canonical arXiv ID
+    """
+    if all_papers is None:
+        all_papers = {}
+
+    search_terms = config["search_terms"]
+    min_citations = config["min_citations"]
+
+    resolver = EntityResolver()
+    plans = plan_queries(search_terms)
+    used_before = dict(get_budget().used)
+
+    print(f"Searching for papers with terms: {search_terms}")
+    print(f"Minimum citations required: {min_citations}")
+    print("Query plan (per-term -> planned queries): " + ", ".join(p.describe() for p in plans.values()))
+
+    openalex_tasks = [
+        asyncio.create_task(_openalex_query(group, min_citations, resolver, watermarks))
+        for group in plans["openalex"].groups
+    ]
+    openalex_done = asyncio.gather(*openalex_tasks, return_exceptions=True)
+
+    tasks = [
+        *(
+            asyncio.create_task(_arxiv_recent(
+                list(group), min_citations, resolver, openalex_done, watermarks, backfill_from, scheduler, dedup_index
+            ))
+            for group in plans["arxiv"].groups
+        ),
+        *(
+            asyncio.create_task(_semantic_scholar_query(group, min_citations, resolver))
+            for group in plans["semantic_scholar"].groups
+        )
+    ]
+
+    results = await asyncio.gather(openalex_done, *tasks, return_exceptions=True)
+    for result in [*results[0], *results[1:]]:
+        if isinstance(result, Exception):
+            print(f"  Source task failed: {result}")
+
+    used = get_budget().used
+    sent = ", ".join(
+        f"{source} {used.get(source, 0) - used_before.get(source, 0)}" for source in plans
+    )
+    print(f"Requests sent (including pages and citation lookups): {sent}")
+
+    resolved = resolver.resolve()
+    joins = ", ".join(f"{count} by {kind}" for kind, count in resolver.joins.most_common())
+    print(
+        f"Entity resolution: {len(resolver)} records -> {len(resolved)} papers with an arXiv ID"
+        + (f" (joined {joins})" if joins else "")
+    )
+    for paper in resolved:
+        all_papers[paper.arxiv_id] = paper
+
+    return list(all_papers.values())
+
+
+def hydrate_openalex_details(papers: list[PaperRecord]) -> set[str]:
+    """
+    Fill in authors and abstracts for OpenAlex papers found with SEARCH_FIELDS.
+
+    Call this on the papers that survived deduplication, so the heavy
+    fields are only downloaded for papers that will be kept.
+
+    Returns:
+        arXiv IDs of papers that are still missing their authors (the
+        detail request failed or was cut by the run budget); they should
+        not be listed this run
+    """
+    # Most cited first, so a tight request budget is spent where it matters most
+    pending = sorted(
+        (p for p in papers if p.source == "openalex" and p.source_id),
+        key=lambda p: p.citation_count,
+        reverse=True
+    )
+    if not pending:
+        return set()
+
+    details = fetch_openalex_details([p.source_id for p in pending])
+    for paper in pending:
+        detail = details.get(paper.source_id)
+        if detail:
+            paper.authors = detail["authors"]
+            paper.abstract = detail["abstract"]
+            # Narrow the query-level provenance now that the abstract is known
+            paper.matched_terms = matching_terms(paper.matched_terms, paper) or paper.matched_terms
+
+    hydrated = sum(1 for p in pending if p.source_id in details)
+    if hydrated:
+        print(f"Fetched abstracts and authors for {hydrated} OpenAlex papers")
+    # Another source's record may already have supplied the authors
+    return {p.arxiv_id for p in pending if p.source_id not in details and not p.authors}
@@ -2,12 +2,15 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Sequence
+
+from readme_index import scan_readme
+from record import PaperRecord
 
 
 def format_paper_entry(
     title: str,
-    authors: list[str],
+    authors: Sequence[str],
     arxiv_id: str,
     venue: Optional[str] = None,
     published_date: Optional[datetime] = None,
@@ -24,7 +27,7 @@ def format_paper_entry(
 
     Args:
         title: Paper title
-        authors: List of author names
+        authors: Author names
         arxiv_id: arXiv ID (e.g., "2210.02747")
         venue: Publication venue (optional)
         published_date: Publication date (optional)
@@ -79,13 +82,13 @@ def format_paper_entry(
     return "\n".join(lines)
 
 
-def format_category_section(category: str, papers: list[dict]) -> str:
+def format_category_section(category: str, papers: list[PaperRecord]) -> str:
     """
     Format a section of papers for a category.
 
     Args:
         category: Category name
-        papers: List of paper dicts
+        papers: List of PaperRecord objects
 
     Returns:
         Formatted markdown section
@@ -97,12 +100,12 @@ def format_category_section(category: str, papers: list[dict]) -> str:
 
     for paper in papers:
         entry = format_paper_entry(
-            title=paper["title"],
-            authors=paper["authors"],
-            arxiv_id=paper["arxiv_id"],
-            venue=paper.get("venue"),
-            published_date=paper.get("published_date"),
-            citation_count=paper.get("citation_count")
+            title=paper.title,
+            authors=paper.authors,
+            arxiv_id=paper.arxiv_id,
+            venue=paper.venue,
+            published_date=paper.published_date,
+            citation_count=paper.citation_count
         )
         lines.append(entry)
         lines.append("")  # Blank line between entries
@@ -111,8 +114,9 @@ def format_category_section(category: str, papers: list[dict]) -> str:
 
 
 def generate_readme(
-    papers_by_category: dict[str, list[dict]],
-    last_updated: datetime
+    papers_by_category: dict[str, list[PaperRecord]],
+    last_updated: datetime,
+    partial: bool = False
 ) -> str:
     """
     Generate the full README content.
@@ -120,6 +124,7 @@ def generate_readme(
     Args:
         papers_by_category: Dict mapping category name to list of papers
         last_updated: Timestamp of last update
+        partial: Mark the update as partial (the run hit its deadline or budget)
 
     Returns:
         Full README markdown content
@@ -131,7 +136,8 @@ def generate_readme(
         "",
         "Automatically curated list of flow matching papers with **10+ citations**.",
         "",
-        f"Last updated: {last_updated.strftime('%Y-%m-%d %H:%M UTC')}",
+        f"Last updated: {last_updated.strftime('%Y-%m-%d %H:%M UTC')}"
+        + (" (partial update; remaining candidates are checked on the next run)" if partial else ""),
         "",
         "This repository automatically tracks new flow matching papers from arXiv and Semantic Scholar,",
         "filtering for quality (minimum 10 citations) and categorizing them using AI.",
@@ -191,58 +197,51 @@ def validate_markdown(content: str) -> list[str]:
         List of warning messages (empty if valid)
     """
     warnings = []
-
-    lines = content.split('\n')
+    index = scan_readme(content)
 
     # Check for basic structure
     if not content.startswith('# '):
         warnings.append("Missing main heading (should start with '# ')")
 
     # Check for unbalanced bold markers
-    bold_count = content.count('**')
-    if bold_count % 2 != 0:
-        warnings.append(f"Unbalanced bold markers (**): found {bold_count}")
+    if index.bold_markers % 2 != 0:
+        warnings.append(f"Unbalanced bold markers (**): found {index.bold_markers}")
 
     # Check for unbalanced italic markers (single *)
-    # Count single asterisks not part of **
-    import re
-    single_asterisks = len(re.findall(r'(?<!\*)\*(?!\*)', content))
-    if single_asterisks % 2 != 0:
-        warnings.append(f"Unbalanced italic markers (*): found {single_asterisks}")
+    if index.single_stars % 2 != 0:
+        warnings.append(f"Unbalanced italic markers (*): found {index.single_stars}")
 
     # Check for broken links
-    links = re.findall(r'\[([^\]]*)\]\(([^)]*)\)', content)
-    for text, url in links:
+    for text, url in index.links:
         if not url or url.isspace():
             warnings.append(f"Empty link URL for text: '{text}'")
         if not text:
             warnings.append(f"Empty link text for URL: '{url}'")
 
     # Check for duplicate arXiv IDs
-    arxiv_ids = re.findall(r'arxiv\.org/abs/(\d{4}\.\d{4,5})', content)
     seen_ids = set()
-    for arxiv_id in arxiv_ids:
-        clean_id = arxiv_id.split('v')[0]
-        if clean_id in seen_ids:
-            warnings.append(f"Duplicate arXiv ID: {clean_id}")
-        seen_ids.add(clean_id)
+    for entry in index.entries:
+        if not entry.arxiv_id:
+            continue
+        if entry.arxiv_id in seen_ids:
+            warnings.append(f"Duplicate arXiv ID: {entry.arxiv_id}")
+        seen_ids.add(entry.arxiv_id)
 
     # Check for empty sections
-    section_pattern = r'^## ([^\n]+)\n\n(?=## |---|$)'
-    empty_sections = re.findall(section_pattern, content, re.MULTILINE)
-    for section in empty_sections:
-        warnings.append(f"Empty section: {section}")
+    section_headers = [h for h in index.headings if h.level == 2]
+    for header in section_headers:
+        if header.empty:
+            warnings.append(f"Empty section: {header.text}")
 
     # Check TOC links match actual sections
-    toc_links = re.findall(r'\[([^\]]+)\]\(#([^)]+)\)', content)
-    section_headers = re.findall(r'^## ([^\n]+)$', content, re.MULTILINE)
-    section_anchors = {h.lower().replace(' ', '-').replace('ö', 'o'): h for h in section_headers}
+    section_anchors = {h.text.lower().replace(' ', '-').replace('ö', 'o'): h.text for h in section_headers}
 
-    for toc_text, toc_anchor in toc_links:
+    for toc_text, toc_url in index.links:
+        if not toc_url.startswith('#'):
+            continue
+        toc_anchor = toc_url[1:]
         if toc_anchor not in section_anchors and toc_anchor not in ['', 'awesome.re']:
-            # Skip external links
-            if not toc_anchor.startswith('http'):
-                warnings.append(f"TOC link '#{toc_anchor}' has no matching section")
+            warnings.append(f"TOC link '#{toc_anchor}' has no matching section")
 
     return warnings
 
@@ -0,0 +1,299 @@
+"""Persistent on-disk HTTP response cache shared by all sources."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+from concurrent.futures import Future
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+import transport
+
+# Seconds a cached response is served without asking the server again
+DEFAULT_TTLS = {
+    "openalex": 6 * 3600,
+    "semantic_scholar": 6 * 3600,
+    "arxiv": 6 * 3600,
+    "readme": 3600,
+}
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_CHUNK_SIZE = 64 * 1024
+
+
+class HTTPCache:
+    """
+    Disk cache keyed by method, URL and request body.
+
+    Fresh entries (younger than the source's TTL) are served from disk.
+    Stale entries with an ETag or Last-Modified are revalidated with a
+    conditional request, and a 304 refreshes them in place. Entries are
+    evicted least recently used first once the cache exceeds max_bytes.
+    Identical requests in flight at the same time share one download.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]],
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttls: Optional[dict[str, int]] = None
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        # Followers waiting to open an entry; eviction leaves these alone
+        self._pinned: dict[str, int] = {}
+        self._stats: dict[str, dict[str, int]] = {}
+        self._total_bytes = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._total_bytes = sum(p.stat().st_size for p in self.cache_dir.glob("*.body"))
+
+    # --- public API ---
+
+    def open(
+        self,
+        url: str,
+        data: Optional[bytes] = None,
+        headers: Optional[dict[str, str]] = None,
+        method: Optional[str] = None,
+        source: str = "default",
+        timeout: float = 30
+    ) -> BinaryIO:
+        """
+        Return a readable binary stream of the response body.
+
+        Raises urllib.error.HTTPError for non-2xx responses, like urlopen.
+        Requests go out over the pooled connections in transport.
+        """
+        method = method or ("POST" if data is not None else "GET")
+
+        if not self.cache_dir:
+            self._count(source, "misses")
+            return self._send(url, data, headers or {}, method, timeout, source)
+
+        key = self._key(method, url, data)
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                leader = Future()
+                self._inflight[key] = leader
+            else:
+                self._pinned[key] = self._pinned.get(key, 0) + 1
+
+        if inflight is not None:
+            # Someone else is already fetching this exact request
+            try:
+                inflight.result()
+                self._count(source, "coalesced")
+                return open(self._body_path(key), "rb")
+            except FileNotFoundError:
+                # Evicted by another process sharing the directory; fetch it again
+                pass
+            finally:
+                with self._lock:
+                    self._pinned[key] -= 1
+                    if not self._pinned[key]:
+                        del self._pinned[key]
+            return self.open(url, data=data, headers=headers, method=method, source=source, timeout=timeout)
+
+        try:
+            self._refresh(key, url, data, headers or {}, method, source, timeout)
+            # Opened while still in flight, so eviction cannot remove it first
+            body = open(self._body_path(key), "rb")
+            leader.set_result(None)
+        except BaseException as e:
+            leader.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+        return body
+
+    def fetch(self, url: str, **kwargs) -> bytes:
+        """Like open(), but returns the whole body."""
+        with self.open(url, **kwargs) as f:
+            return f.read()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Per-source counters: hits, revalidated, misses, coalesced."""
+        with self._lock:
+            return {source: dict(counts) for source, counts in self._stats.items()}
+
+    # --- internals ---
+
+    def _key(self, method: str, url: str, data: Optional[bytes]) -> str:
+        digest = hashlib.sha256()
+        digest.update(method.encode())
+        digest.update(b"\0")
+        digest.update(url.encode())
+        digest.update(b"\0")
+        digest.update(data or b"")
+        return digest.hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.body"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.meta"
+
+    def _count(self, source: str, counter: str) -> None:
+        with self._lock:
+            counts = self._stats.setdefault(source, {"hits": 0, "revalidated": 0, "misses": 0, "coalesced": 0})
+            counts[counter] += 1
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return meta if self._body_path(key).exists() else None
+
+    def _temp_file(self, mode: str):
+        """Uniquely named temp file in the cache directory, so processes sharing it never write the same one."""
+        return tempfile.NamedTemporaryFile(mode, dir=self.cache_dir, suffix=".tmp", delete=False)
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        with self._temp_file("w") as f:
+            json.dump(meta, f)
+        os.replace(f.name, self._meta_path(key))
+
+    def _refresh(
+        self,
+        key: str,
+        url: str,
+        data: Optional[bytes],
+        headers: dict[str, str],
+        method: str,
+        source: str,
+        timeout: float
+    ) -> None:
+        """Make sure the body file for key is fresh, fetching or revalidating as needed."""
+        meta = self._load_meta(key)
+        now = time.time()
+
+        if meta and now - meta["stored_at"] < self.ttls.get(source, 0):
+            self._count(source, "hits")
+            os.utime(self._meta_path(key))  # Mark as recently used
+            return
+
+        request_headers = dict(headers)
+        if meta:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self._send(url, data, request_headers, method, timeout, source)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                self._count(source, "revalidated")
+                meta["stored_at"] = now
+                self._write_meta(key, meta)
+                return
+            raise
+
+        self._count(source, "misses")
+        with response:
+            with self._temp_file("wb") as f:
+                try:
+                    shutil.copyfileobj(response, f, _CHUNK_SIZE)
+                except BaseException:
+                    f.close()
+                    os.unlink(f.name)
+                    raise
+                size = f.tell()
+            old_size = self._body_path(key).stat().st_size if meta else 0
+            os.replace(f.name, self._body_path(key))
+            self._write_meta(key, {
+                "url": url,
+                "source": source,
+                "stored_at": now,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": size
+            })
+
+        with self._lock:
+            self._total_bytes += size - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict(keep=key)
+
+    def _send(
+        self,
+        url: str,
+        data: Optional[bytes],
+        headers: dict[str, str],
+        method: str,
+        timeout: float,
+        source: str
+    ) -> BinaryIO:
+        return transport.request(url, data=data, headers=headers, method=method, timeout=timeout, source=source)
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used entries until the cache is under 90% of max_bytes."""
+        metas = sorted(self.cache_dir.glob("*.meta"), key=lambda p: p.stat().st_mtime)
+        target = self.max_bytes * 0.9
+
+        for meta_path in metas:
+            with self._lock:
+                if self._total_bytes <= target:
+                    return
+            key = meta_path.stem
+            with self._lock:
+                busy = key == keep or key in self._inflight or key in self._pinned
+            if busy:
+                continue
+            body_path = self._body_path(key)
+            try:
+                size = body_path.stat().st_size
+                body_path.unlink()
+                meta_path.unlink()
+            except FileNotFoundError:
+                continue
+            with self._lock:
+                self._total_bytes -= size
+
+
+_cache = HTTPCache(None)
+
+
+def configure_cache(
+    cache_dir: Optional[Union[str, Path]],
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    ttls: Optional[dict[str, int]] = None
+) -> HTTPCache:
+    """Replace the shared cache (cache_dir=None disables caching)."""
+    global _cache
+    _cache = HTTPCache(cache_dir, max_bytes=max_bytes, ttls=ttls)
+    return _cache
+
+
+def get_cache() -> HTTPCache:
+    """Return the shared cache."""
+    return _cache
+
+
+def cached_open(url: str, **kwargs) -> BinaryIO:
+    """Open url through the shared cache. See HTTPCache.open."""
+    return _cache.open(url, **kwargs)
+
+
+def cached_fetch(url: str, **kwargs) -> bytes:
+    """Fetch url's body through the shared cache. See HTTPCache.open."""
+    return _cache.fetch(url, **kwargs)
@@ -2,24 +2,40 @@
 """Main orchestration script for awesome-flow-matching-autoupdate."""
 from __future__ import annotations
 
+import argparse
+import asyncio
+import math
 import os
 import sys
-import time
 import yaml
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from sources.arxiv import search_arxiv, Paper
-from sources.semantic_scholar import search_semantic_scholar, get_paper_details
-from sources.openalex import search_openalex, get_citation_count_openalex
-from dedup import load_existing_papers, load_local_readme, is_duplicate, normalize_title
+from fetch_engine import fetch_all_papers_async, hydrate_openalex_details
+from sources.openalex import CITATION_BATCH_SIZE
+from record import PaperRecord
+from refresh import RefreshScheduler
+from store import PaperStore, open_store
+from watermarks import Watermarks, load_watermarks
+from http_cache import configure_cache, get_cache
+from transport import transfer_stats, transport_stats
+from rate_control import rate_stats
+from run_budget import BudgetExceededError, configure_budget, get_budget
+from shared_quota import Quota, configure_quotas, default_quotas, quota_stats
+from dedup import DedupIndex, load_existing_papers
+from title_index import DEFAULT_THRESHOLD, TitleIndex
 from classifier import classify_paper
 from formatter import generate_readme, validate_markdown
 
 
+# Sources whose watermarks advance during the fetch stage
+FETCH_SOURCES = {"openalex", "arxiv", "semantic_scholar"}
+
+
 def load_config() -> dict:
     """Load configuration from config.yaml."""
     config_path = Path(__file__).parent.parent / "config.yaml"
@@ -27,161 +43,56 @@ def load_config() -> dict:
         return yaml.safe_load(f)
 
 
-def fetch_all_papers(config: dict) -> list[dict]:
+def fetch_all_papers(
+    config: dict,
+    watermarks: Optional[Watermarks] = None,
+    backfill_from: Optional[datetime] = None,
+    scheduler: Optional[RefreshScheduler] = None,
+    dedup_index: Optional[DedupIndex] = None
+) -> list[PaperRecord]:
     """
     Fetch papers from all sources.
 
-    Returns list of paper dicts with normalized fields.
+    Synchronous wrapper around fetch_engine.fetch_all_papers_async, which
+    queries every source and search term concurrently.
+
+    Returns list of PaperRecord objects, one per canonical arXiv ID.
+    """
+    return asyncio.run(fetch_all_papers_async(
+        config,
+        watermarks=watermarks,
+        backfill_from=backfill_from,
+        scheduler=scheduler,
+        dedup_index=dedup_index
+    ))
+
+
+def filter_duplicates(papers: list[PaperRecord], dedup_index: DedupIndex) -> list[PaperRecord]:
     """
-    all_papers = {}  # Use dict to dedupe by arxiv_id
-
-    search_terms = config["search_terms"]
-    min_citations = config["min_citations"]
-
-    print(f"Searching for papers with terms: {search_terms}")
-    print(f"Minimum citations required: {min_citations}")
-
-    # 1. Search OpenAlex directly (free, no rate limits, has citation counts)
-    print("\n[1/3] Fetching from OpenAlex...")
-    for term in search_terms:
-        print(f"  Searching: '{term}'")
-        oa_papers = search_openalex(
-            term,
-            limit=200,
-            min_citation_count=min_citations,
-            year_from=2020
+    Filter out papers that already exist in the original repo or are listed here (exactly or as near-duplicate titles).
+
+    Reports the per-paper calls the dropped duplicates would have cost in
+    the later stages (detail hydration and classification).
+    """
+    new_papers, duplicates = dedup_index.split(papers)
+    for paper in duplicates:
+        print(f"  Skipping duplicate: {paper.title[:50]}...")
+
+    if duplicates:
+        def detail_requests(batch: list[PaperRecord]) -> int:
+            pending = sum(1 for p in batch if p.source == "openalex" and p.source_id)
+            return math.ceil(pending / CITATION_BATCH_SIZE)
+
+        print(
+            f"  Avoided for {len(duplicates)} duplicates: up to "
+            f"{detail_requests(papers) - detail_requests(new_papers)} OpenAlex detail requests, "
+            f"{len(duplicates)} classification calls"
         )
-        print(f"    Found {len(oa_papers)} papers with {min_citations}+ citations")
-
-        for paper in oa_papers:
-            # Skip if no arXiv ID (we prefer arXiv links)
-            if not paper.arxiv_id:
-                continue
-
-            clean_id = paper.arxiv_id.split("v")[0]
-
-            # Skip if already have this paper
-            if clean_id in all_papers:
-                continue
-
-            all_papers[clean_id] = {
-                "arxiv_id": clean_id,
-                "title": paper.title,
-                "authors": paper.authors,
-                "abstract": paper.abstract,
-                "published_date": None,
-                "citation_count": paper.citation_count,
-                "venue": paper.venue,
-                "arxiv_url": f"https://arxiv.org/abs/{clean_id}"
-            }
-
-        time.sleep(0.5)  # Be polite
-
-    # 2. Search arXiv for recent papers and check citations via OpenAlex
-    print("\n[2/3] Fetching recent papers from arXiv...")
-    arxiv_papers = search_arxiv(search_terms, max_results=200)
-    print(f"  Found {len(arxiv_papers)} papers on arXiv")
-
-    papers_to_check = []
-    for paper in arxiv_papers:
-        if not paper.arxiv_id:
-            continue
-        clean_id = paper.arxiv_id.split("v")[0]
-        if clean_id not in all_papers:
-            papers_to_check.append(paper)
-
-    print(f"  Checking citations for {len(papers_to_check)} new papers...")
-    for i, paper in enumerate(papers_to_check):
-        clean_id = paper.arxiv_id.split("v")[0]
-
-        # Get citation count from OpenAlex
-        details = get_citation_count_openalex(clean_id)
-
-        if details:
-            citation_count = details.get("citation_count", 0)
-            venue = details.get("venue", "")
-        else:
-            citation_count = 0
-            venue = ""
-
-        # Apply citation filter
-        if citation_count >= min_citations:
-            print(f"    [{i+1}/{len(papers_to_check)}] {paper.title[:40]}... ({citation_count} citations) ✓")
-            all_papers[clean_id] = {
-                "arxiv_id": clean_id,
-                "title": paper.title,
-                "authors": paper.authors,
-                "abstract": paper.abstract,
-                "published_date": paper.published_date,
-                "citation_count": citation_count,
-                "venue": venue,
-                "arxiv_url": f"https://arxiv.org/abs/{clean_id}"
-            }
-
-        time.sleep(0.2)  # Rate limiting
-
-    # 3. Optionally try Semantic Scholar as backup
-    print("\n[3/3] Checking Semantic Scholar for additional papers...")
-    for term in search_terms:
-        print(f"  Searching: '{term}'")
-        try:
-            ss_papers = search_semantic_scholar(
-                term,
-                limit=50,
-                min_citation_count=min_citations,
-                year_from=2020
-            )
-            print(f"    Found {len(ss_papers)} papers")
-
-            for paper in ss_papers:
-                if not paper.arxiv_id:
-                    continue
-
-                clean_id = paper.arxiv_id.split("v")[0]
-                if clean_id in all_papers:
-                    continue
-
-                all_papers[clean_id] = {
-                    "arxiv_id": clean_id,
-                    "title": paper.title,
-                    "authors": paper.authors,
-                    "abstract": paper.abstract,
-                    "published_date": None,
-                    "citation_count": paper.citation_count,
-                    "venue": paper.venue,
-                    "arxiv_url": f"https://arxiv.org/abs/{clean_id}"
-                }
-        except Exception as e:
-            print(f"    Semantic Scholar error: {e}")
-
-        time.sleep(2)  # Rate limiting
-
-    return list(all_papers.values())
-
-
-def filter_duplicates(
-    papers: list[dict],
-    existing_arxiv_ids: set[str],
-    existing_titles: set[str]
-) -> list[dict]:
-    """Filter out papers that already exist in the original repo."""
-    new_papers = []
-
-    for paper in papers:
-        if is_duplicate(
-            paper["arxiv_id"],
-            paper["title"],
-            existing_arxiv_ids,
-            existing_titles
-        ):
-            print(f"  Skipping duplicate: {paper['title'][:50]}...")
-            continue
-        new_papers.append(paper)
 
     return new_papers
 
 
-def classify_papers(papers: list[dict]) -> dict[str, list[dict]]:
+def classify_papers(papers: list[PaperRecord]) -> dict[str, list[PaperRecord]]:
     """Classify papers into categories."""
     papers_by_category = {
         "Foundational": [],
@@ -194,55 +105,251 @@ def classify_papers(papers: list[dict]) -> dict[str, list[dict]]:
 
     print(f"\nClassifying {len(papers)} papers...")
 
-    for paper in papers:
-        category = classify_paper(paper["title"], paper["abstract"])
-        paper["category"] = category
+    # Most cited (then newest) first, so a run that hits its deadline lists the best papers
+    ordered = sorted(
+        papers,
+        key=lambda p: (p.citation_count, p.published_date.timestamp() if p.published_date else 0),
+        reverse=True
+    )
+    for done, paper in enumerate(ordered):
+        try:
+            category = classify_paper(paper.title, paper.abstract)
+        except BudgetExceededError as e:
+            # Unclassified papers stay unlisted; save_watermarks keeps the old marks
+            # so the next run fetches them again
+            get_budget().note_partial(f"classification stopped ({e.reason}); {len(ordered) - done} papers left for the next run")
+            print(f"  Stopping classification: {e.reason}")
+            break
+        paper.category = category
         papers_by_category[category].append(paper)
-        print(f"  [{category}] {paper['title'][:60]}...")
+        print(f"  [{category}] {paper.title[:60]}...")
 
     return papers_by_category
 
 
-def main():
+def make_refresh_scheduler(config: dict, store: PaperStore) -> RefreshScheduler:
+    """Build the citation refresh scheduler from the citation_refresh config section."""
+    refresh_config = config.get("citation_refresh", {}) or {}
+    return RefreshScheduler(
+        store,
+        config["min_citations"],
+        budget=refresh_config.get("budget_requests"),
+        max_age_days=refresh_config.get("max_age_days", 30),
+        max_stored=refresh_config.get("max_stored_candidates")
+    )
+
+
+def setup_run_budget(config: dict) -> None:
+    """Apply the run_budget config section (deadline and per-source request caps)."""
+    budget_config = config.get("run_budget", {}) or {}
+    deadline_minutes = budget_config.get("deadline_minutes")
+    configure_budget(
+        deadline_seconds=deadline_minutes * 60 if deadline_minutes else None,
+        requests=budget_config.get("requests")
+    )
+
+
+def setup_shared_quota(config: dict, repo_root: Path) -> None:
+    """Share per-host request quotas with other updater processes (shared_quota config section)."""
+    quota_config = config.get("shared_quota", {}) or {}
+    if not quota_config.get("enabled", True):
+        configure_quotas(None)
+        return
+
+    quotas = default_quotas()
+    for host, rate in (quota_config.get("requests_per_second", {}) or {}).items():
+        quotas[host] = Quota(rate=rate, burst=max(1.0, rate))
+    configure_quotas(repo_root / quota_config.get("dir", ".cache/quota"), quotas)
+
+
+def setup_http_cache(config: dict, repo_root: Path) -> None:
+    """Point the shared HTTP cache at the directory and limits from config."""
+    cache_config = config.get("http_cache", {}) or {}
+    if not cache_config.get("enabled", True):
+        configure_cache(None)
+        return
+
+    ttl_hours = cache_config.get("ttl_hours", {}) or {}
+    configure_cache(
+        repo_root / cache_config.get("dir", ".cache/http"),
+        max_bytes=int(cache_config.get("max_mb", 256) * 1024 * 1024),
+        ttls={source: int(hours * 3600) for source, hours in ttl_hours.items()}
+    )
+
+
+def save_watermarks(watermarks: Watermarks) -> None:
+    """
+    Save the watermarks, unless the run was partial.
+
+    A run cut short anywhere (fetch, detail hydration, classification)
+    leaves papers it found but never listed; keeping every source's
+    previous mark makes the next incremental run fetch them again.
+    """
+    if get_budget().partial:
+        print("Run was partial; keeping previous watermarks so skipped papers are fetched again")
+        for source in FETCH_SOURCES:
+            watermarks.hold(source)
+    watermarks.save()
+    print(f"Watermarks saved to {watermarks.path}")
+
+
+def print_run_stats() -> None:
+    """Print HTTP cache, connection, transfer, rate-control and quota stats."""
+    stats = get_cache().stats()
+    if stats:
+        print("\nHTTP cache:")
+        for source, counts in sorted(stats.items()):
+            print(
+                f"  {source}: {counts['hits']} hits, {counts['revalidated']} revalidated, "
+                f"{counts['misses']} misses, {counts['coalesced']} coalesced"
+            )
+
+    connections = transport_stats()
+    if connections:
+        print("\nConnections:")
+        for host, counts in sorted(connections.items()):
+            print(f"  {host}: {counts['opened']} opened, {counts['reused']} reused")
+
+    transfers = transfer_stats()
+    if transfers:
+        print("\nTransfer (wire / decoded):")
+        for source, counts in sorted(transfers.items()):
+            print(f"  {source}: {counts['wire'] / 1024:.1f} KiB / {counts['decoded'] / 1024:.1f} KiB")
+
+    rates = rate_stats()
+    if rates:
+        print("\nRate control:")
+        for host, state in sorted(rates.items()):
+            print(
+                f"  {host}: circuit {state['state']}, interval {state['interval']:.2f}s, "
+                f"{state['requests']} requests, {state['throttled']} throttled, {state['failures']} failures, "
+                f"{state['circuit_opens']} circuit opens, {state['rejected']} rejected, "
+                f"waited {state['waited']:.1f}s, avg latency {state['avg_latency']:.2f}s"
+            )
+
+    quotas = quota_stats()
+    if quotas:
+        print("\nShared quota:")
+        for host, counts in sorted(quotas.items()):
+            print(
+                f"  {host}: {counts['acquired']} requests, waited {counts['waited']:.1f}s, "
+                f"{counts['rejected']} rejected"
+            )
+
+    budget = get_budget()
+    if budget.used or budget.partial:
+        used = ", ".join(f"{source} {count}" for source, count in sorted(budget.used.items()))
+        print(f"\nRun budget: requests used: {used or 'none'}")
+        for line in budget.summary():
+            print(f"  Partial: {line}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Update the awesome flow matching list")
+    parser.add_argument(
+        "--full-rescan",
+        action="store_true",
+        help="Ignore stored watermarks and fetch all-time results from every source"
+    )
+    parser.add_argument(
+        "--backfill-from",
+        type=datetime.fromisoformat,
+        metavar="YYYY-MM-DD",
+        help="Harvest arXiv via OAI-PMH from this date instead of the search API"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None):
     """Main entry point."""
+    args = parse_args(argv)
+
     print("=" * 60)
     print("Awesome Flow Matching Auto-Update")
     print("=" * 60)
 
     # Load config
     config = load_config()
-    readme_path = Path(__file__).parent.parent / "README.md"
+    repo_root = Path(__file__).parent.parent
+    readme_path = repo_root / "README.md"
+    setup_http_cache(config, repo_root)
+    setup_run_budget(config)
+    setup_shared_quota(config, repo_root)
+
+    watermarks = load_watermarks(
+        repo_root / config.get("watermark_file", "state/watermarks.json"),
+        full_rescan=args.full_rescan or config.get("full_rescan", False),
+        overlap_days=config.get("search_days_back", 0)
+    )
 
     # Step 1: Load existing papers from original repo (dongzhuoyao/awesome-flow-matching)
     print("\n[Step 1] Loading existing papers from original repository...")
     print(f"  Source: {config['original_readme_url']}")
     orig_arxiv_ids, orig_titles = load_existing_papers(
-        config["original_readme_url"]
+        config["original_readme_url"],
+        index_dir=repo_root / config.get("readme_index_dir", ".cache/readme")
     )
 
-    # Step 2: Load existing papers from our local README (to avoid self-duplicates)
-    print("\n[Step 2] Loading existing papers from local README...")
-    local_arxiv_ids, local_titles = load_local_readme(str(readme_path))
+    # Step 2: Open the local paper store (to avoid self-duplicates); seeded from README on first use
+    print("\n[Step 2] Opening local paper store...")
+    store = open_store(repo_root / config.get("paper_store", "state/papers.db"), readme_path)
+    print(f"  {store.count(listed_only=True)} listed papers, {store.count()} known candidates")
 
-    # Merge both sets for comprehensive deduplication
-    existing_arxiv_ids = orig_arxiv_ids | local_arxiv_ids
-    existing_titles = orig_titles | local_titles
-    print(f"\nTotal unique papers to exclude: {len(existing_arxiv_ids)} arXiv IDs, {len(existing_titles)} titles")
+    # Everything already listed (exactly or as near-duplicate titles), built before
+    # fetching so duplicates are dropped before any per-paper lookup is paid for
+    similarity = (config.get("dedup", {}) or {}).get("title_similarity", DEFAULT_THRESHOLD)
+    title_index = TitleIndex(orig_titles | {p.title for p in store.listed_papers()}, threshold=similarity)
+    dedup_index = DedupIndex(orig_arxiv_ids, orig_titles, title_index, store)
+    print(f"  Dedup index: {len(orig_arxiv_ids)} original arXiv IDs, {len(title_index)} listed titles")
 
     # Step 3: Fetch papers from all sources
     print("\n[Step 3] Fetching papers from sources...")
-    all_papers = fetch_all_papers(config)
+    if watermarks.full_rescan or not watermarks.marks:
+        print("  Full rescan (no watermarks in use)")
+    else:
+        print(f"  Incremental since: {watermarks.marks} (minus {watermarks.overlap_days} days overlap)")
+    all_papers = fetch_all_papers(
+        config,
+        watermarks,
+        backfill_from=args.backfill_from,
+        scheduler=make_refresh_scheduler(config, store),
+        dedup_index=dedup_index
+    )
     print(f"\nTotal papers found with {config['min_citations']}+ citations: {len(all_papers)}")
+    if set(get_budget().refused) & FETCH_SOURCES:
+        print("  Fetch was cut short by the run budget")
+    store.upsert_papers(all_papers)
 
     # Step 4: Filter duplicates (incremental update - only new papers)
     print("\n[Step 4] Filtering duplicates (incremental update)...")
-    new_papers = filter_duplicates(all_papers, existing_arxiv_ids, existing_titles)
+    # Papers an earlier run held back are not always fetched again (finished
+    # arXiv history windows are skipped), so they are re-queued from the store
+    fetched_ids = {p.arxiv_id for p in all_papers}
+    held_back, _ = dedup_index.split(
+        [p for p in store.unlisted_at_least(config["min_citations"]) if p.arxiv_id not in fetched_ids]
+    )
+    if held_back:
+        print(f"  Re-queued {len(held_back)} papers held back by earlier runs")
+    new_papers = filter_duplicates(all_papers + held_back, dedup_index)
     print(f"New papers after deduplication: {len(new_papers)}")
 
     if not new_papers:
         print("\nNo new papers to add!")
+        store.close()
+        save_watermarks(watermarks)
+        print_run_stats()
         return
 
+    # Abstracts and author lists were left out of the OpenAlex search; fetch them for survivors only
+    unhydrated = hydrate_openalex_details(new_papers)
+    if unhydrated:
+        # Listing them would write entries with no authors that nothing fills in later;
+        # a partial run keeps the watermarks, so the next run fetches them again
+        get_budget().note_partial(f"{len(unhydrated)} papers left for the next run (details not fetched)")
+        print(f"  Holding back {len(unhydrated)} papers whose authors and abstract could not be fetched")
+        new_papers = [p for p in new_papers if p.arxiv_id not in unhydrated]
+
     # Step 5: Classify papers
     print("\n[Step 5] Classifying papers...")
     papers_by_category = classify_papers(new_papers)
@@ -254,9 +361,11 @@ def main():
         if papers:
             print(f"  {category}: {len(papers)} papers")
 
-    # Step 6: Generate README
+    # Step 6: Generate README from every listed paper in the store
     print("\n[Step 6] Generating README.md...")
-    readme_content = generate_readme(papers_by_category, datetime.utcnow())
+    store.upsert_papers(new_papers)
+    readme_content = generate_readme(store.papers_by_category(), datetime.utcnow(), partial=get_budget().partial)
+    store.close()
 
     # Step 7: Sanity check - validate markdown format
     print("\n[Step 7] Validating markdown format...")
@@ -273,6 +382,9 @@ def main():
         f.write(readme_content)
 
     print(f"\nREADME written to {readme_path}")
+
+    save_watermarks(watermarks)
+    print_run_stats()
     print("\nDone!")
 
 
@@ -0,0 +1,86 @@
+"""Query planner - collapses search terms into as few remote queries as each API allows."""
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from record import PaperRecord
+
+# OpenAlex accepts at most 50 OR'd values in a single filter
+OPENALEX_MAX_TERMS = 50
+
+# Characters that would break out of a quoted OpenAlex filter value or arXiv phrase
+_RESERVED = str.maketrans({'"': " ", ",": " ", "|": " "})
+
+
+def clean_term(term: str) -> str:
+    """Search term with filter syntax characters removed and whitespace collapsed."""
+    return " ".join(term.translate(_RESERVED).split())
+
+
+@dataclass
+class QueryPlan:
+    """
+    How one source's search terms map onto remote queries.
+
+    Each group is answered by a single query (plus its result pages);
+    per_term_queries is what the same terms cost with one query per term.
+    """
+    source: str
+    groups: list[tuple[str, ...]] = field(default_factory=list)
+    per_term_queries: int = 0
+
+    @property
+    def queries(self) -> int:
+        return len(self.groups)
+
+    def describe(self) -> str:
+        return f"{self.source} {self.per_term_queries} -> {self.queries}"
+
+
+def _grouped(terms: list[str], size: int) -> list[tuple[str, ...]]:
+    return [tuple(terms[start:start + size]) for start in range(0, len(terms), size)]
+
+
+def plan_queries(search_terms: Iterable[str]) -> dict[str, QueryPlan]:
+    """
+    Compile the configured search terms into per-source query plans.
+
+    - OpenAlex: terms are OR'd inside one title_and_abstract.search filter,
+      up to OPENALEX_MAX_TERMS per query.
+    - arXiv: all terms go into one search_query (ti:/abs: phrases OR'd),
+      which is how sources.arxiv already queries.
+    - Semantic Scholar: bulk search ORs the phrases in one query (its
+      continuation tokens page through every match).
+
+    Args:
+        search_terms: Terms from config.yaml
+
+    Returns:
+        Dict mapping source name to its QueryPlan
+    """
+    terms = list(dict.fromkeys(t for t in map(clean_term, search_terms) if t))
+    return {
+        "openalex": QueryPlan("openalex", _grouped(terms, OPENALEX_MAX_TERMS), len(terms)),
+        "arxiv": QueryPlan("arxiv", [tuple(terms)] if terms else [], 1 if terms else 0),
+        "semantic_scholar": QueryPlan("semantic_scholar", [tuple(terms)] if terms else [], len(terms)),
+    }
+
+
+def matching_terms(terms: Iterable[str], paper: PaperRecord) -> tuple[str, ...]:
+    """Terms found (case-insensitively) in the paper's title or abstract."""
+    text = " ".join(f"{paper.title} {paper.abstract}".lower().replace("-", " ").split())
+    return tuple(t for t in terms if " ".join(t.lower().replace("-", " ").split()) in text)
+
+
+def tag_matches(paper: PaperRecord, terms: tuple[str, ...]) -> None:
+    """
+    Record which of a combined query's terms a result matched.
+
+    The API only says the record matched the query as a whole, so the
+    terms are checked locally. If none is found verbatim (the API stems
+    and tokenizes), every term of the query is kept as the provenance.
+    """
+    matched = matching_terms(terms, paper) or terms
+    paper.matched_terms = tuple(sys.intern(t) for t in matched)
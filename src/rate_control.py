@@ -0,0 +1,225 @@
+"""Adaptive per-host request pacing with Retry-After support and circuit breaking."""
+from __future__ import annotations
+
+import email.utils
+import threading
+import time
+import urllib.error
+from datetime import datetime, timezone
+from typing import Optional
+
+from concurrency import HOST_LIMITS
+
+# Additive increase (requests/second per success) and multiplicative decrease on 429/503
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+
+# Never pace a throttled host slower than this
+MIN_RATE = 1 / 60
+
+# Starting rate for a host without a politeness interval once it throttles us;
+# it is released from pacing again when it recovers past UNPACED_RATE
+FALLBACK_RATE = 2.0
+UNPACED_RATE = 10.0
+
+# A response this many times slower than the host's average eases the rate off
+SLOW_FACTOR = 3.0
+SLOW_DECREASE = 0.8
+LATENCY_SMOOTHING = 0.2
+
+# Consecutive failures (429, 5xx, connection errors) that open the circuit
+FAILURE_THRESHOLD = 5
+
+# Circuit cooldown, doubled each time the circuit reopens
+BASE_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+# Waits longer than this fail fast instead of blocking a worker thread
+MAX_BLOCKING_WAIT = 120.0
+
+
+class CircuitOpenError(urllib.error.URLError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"circuit open for {host}, retry in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class HostRateController:
+    """
+    Paces requests to one host and trips a circuit breaker when it keeps failing.
+
+    The request rate starts at the host's politeness limit (HOST_LIMITS),
+    grows additively after successes and halves on 429/503. Retry-After
+    pushes the next request out by at least the requested delay. After
+    FAILURE_THRESHOLD consecutive failures the circuit opens: requests fail
+    fast with CircuitOpenError until the cooldown passes, then one trial
+    request decides whether it closes or reopens for twice as long.
+
+    Thread-safe; blocking waits happen in the calling (worker) thread.
+    """
+
+    def __init__(self, host: str, min_interval: float = 0.0):
+        self.host = host
+        self.max_rate = 1 / min_interval if min_interval > 0 else None
+        self.rate = self.max_rate  # None means unpaced
+        self.avg_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.state = "closed"
+        self.cooldown = BASE_COOLDOWN
+        self.stats = {
+            "requests": 0, "throttled": 0, "failures": 0,
+            "slow": 0, "circuit_opens": 0, "rejected": 0, "waited": 0.0
+        }
+        self._next_start = 0.0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until the next request to this host may start.
+
+        Raises:
+            CircuitOpenError: The circuit is open, another trial request is in
+                flight, or the wait would exceed MAX_BLOCKING_WAIT
+        """
+        with self._lock:
+            now = time.monotonic()
+            trial = False
+            if self.state == "open":
+                if now < self._open_until:
+                    self.stats["rejected"] += 1
+                    raise CircuitOpenError(self.host, self._open_until - now)
+                # Cooldown over: this request is the trial
+                self.state = "half_open"
+                trial = True
+            elif self.state == "half_open":
+                # Only the trial request goes out until it has an outcome
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.host, self.cooldown)
+
+            start = max(now, self._next_start)
+            wait = start - now
+            if wait > MAX_BLOCKING_WAIT:
+                self.stats["rejected"] += 1
+                if trial:
+                    self.state = "open"  # The next request gets the trial instead
+                raise CircuitOpenError(self.host, wait)
+            self._next_start = start + (1 / self.rate if self.rate else 0.0)
+            self.stats["requests"] += 1
+            self.stats["waited"] += wait
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def cancel(self) -> None:
+        """
+        Account a request that acquire() let through but that never reached the host.
+
+        If it was the half-open trial, the circuit goes back to open with
+        its cooldown already over, so the next request becomes the trial.
+        """
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+
+    def record_success(self, latency: float) -> None:
+        """Account a response that was not throttled and not a server error."""
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == "half_open":
+                self.state = "closed"
+                self.cooldown = BASE_COOLDOWN
+
+            slow = self.avg_latency is not None and latency > SLOW_FACTOR * self.avg_latency
+            self.avg_latency = latency if self.avg_latency is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.avg_latency
+            )
+            if slow:
+                self.stats["slow"] += 1
+                self._set_rate((self.rate or FALLBACK_RATE) * SLOW_DECREASE)
+            elif self.rate is not None:
+                self._set_rate(self.rate + RATE_INCREASE)
+
+    def record_throttle(self, retry_after: Optional[float]) -> None:
+        """Account a 429/503: slow down and respect the server's Retry-After."""
+        with self._lock:
+            self.stats["throttled"] += 1
+            self._set_rate((self.rate or FALLBACK_RATE) * RATE_DECREASE)
+            if retry_after:
+                self._next_start = max(self._next_start, time.monotonic() + retry_after)
+            self._fail()
+
+    def record_failure(self) -> None:
+        """Account a 5xx response or a connection error."""
+        with self._lock:
+            self._fail()
+
+    def snapshot(self) -> dict:
+        """Current state and counters, for run stats."""
+        with self._lock:
+            return {
+                **self.stats,
+                "state": self.state,
+                "interval": 1 / self.rate if self.rate else 0.0,
+                "avg_latency": self.avg_latency or 0.0
+            }
+
+    def _set_rate(self, rate: float) -> None:
+        rate = max(rate, MIN_RATE)
+        if self.max_rate is not None:
+            self.rate = min(rate, self.max_rate)
+        else:
+            self.rate = None if rate >= UNPACED_RATE else rate
+
+    def _fail(self) -> None:
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open":
+            self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self._open()
+        elif self.consecutive_failures >= FAILURE_THRESHOLD:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.stats["circuit_opens"] += 1
+        self._open_until = max(time.monotonic() + self.cooldown, self._next_start)
+
+
+_controllers: dict[str, HostRateController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(host: str) -> HostRateController:
+    """Return the shared controller for a host, creating it from HOST_LIMITS."""
+    with _controllers_lock:
+        if host not in _controllers:
+            limit = HOST_LIMITS.get(host)
+            _controllers[host] = HostRateController(host, limit.min_interval if limit else 0.0)
+        return _controllers[host]
+
+
+def rate_stats() -> dict[str, dict]:
+    """Per-host controller state and counters."""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {c.host: c.snapshot() for c in controllers}
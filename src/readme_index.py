@@ -0,0 +1,202 @@
+"""Single-pass README scanner shared by dedup, validation, the store bootstrap and sync."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Union
+
+from record import canonical_arxiv_id
+
+# Bumped whenever scanning results change, which invalidates parses saved by dedup
+SCANNER_VERSION = 3
+
+# Inline tokens, tried left to right at each position. "lead" takes the
+# extra stars before a bold span ("***x***"), so the span still matches.
+_INLINE_PATTERN = rb"""
+    (?P<lead>\*+)(?=\*\*[^*]+\*\*)
+  | \*\*(?P<bold>[^*]+)\*\*
+  | \[(?P<link_text>[^\]]*)\]\((?P<link_url>[^)]*)\)
+  | arxiv\.org/(?:abs|pdf)/(?P<url_id>\d{4}\.\d{4,5})
+  | (?i:arxiv)[:\s]+(?P<tag_id>\d{4}\.\d{4,5})
+  | (?P<stars>\*+)
+"""
+
+# Headings plus the inline tokens in one alternation, so the README is
+# tokenized in a single finditer pass. Works on UTF-8 bytes, which makes
+# match positions byte offsets.
+_TOKEN = re.compile(
+    rb"^(?P<hashes>\#{1,6})[ ](?P<heading>[^\n]+?)[ \t]*$|" + _INLINE_PATTERN,
+    re.MULTILINE | re.VERBOSE
+)
+
+# Inline tokens inside text the main pass consumed as one token (heading
+# text, link text, bold spans), scanned again so nothing in them is lost
+_INLINE = re.compile(_INLINE_PATTERN, re.VERBOSE)
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for comparison (lowercase, whitespace collapsed)."""
+    return " ".join(title.lower().split())
+
+
+@dataclass(slots=True)
+class ReadmeEntry:
+    """One paper entry: a line starting with a bold title, up to the next blank line or heading."""
+    section: str  # Nearest "## " heading above the entry ("" if none)
+    title: str
+    normalized_title: str
+    arxiv_id: str  # First arXiv ID in the entry ("" if none)
+    offset: int  # Byte offset in the UTF-8 README
+    length: int  # Byte length
+
+
+@dataclass(slots=True)
+class ReadmeHeading:
+    level: int
+    text: str
+    offset: int
+    empty: bool = False  # Nothing but a rule (---) before the next heading
+
+
+@dataclass
+class ReadmeIndex:
+    """Everything the pipeline reads from a README, collected in one scan."""
+    data: bytes
+    entries: list[ReadmeEntry] = field(default_factory=list)
+    headings: list[ReadmeHeading] = field(default_factory=list)
+    links: list[tuple[str, str]] = field(default_factory=list)
+    # Every arXiv ID anywhere (URLs and "arXiv:" tags), canonical
+    arxiv_ids: set[str] = field(default_factory=set)
+    # Every bold span, normalized (what dedup has always treated as titles)
+    titles: set[str] = field(default_factory=set)
+    bold_markers: int = 0
+    single_stars: int = 0
+
+    def text(self, entry: ReadmeEntry) -> str:
+        """The entry's markdown, as it appears in the README."""
+        return self.data[entry.offset:entry.offset + entry.length].decode("utf-8")
+
+    def sections(self) -> dict[str, list[ReadmeEntry]]:
+        """Entries grouped by section, in README order."""
+        grouped: dict[str, list[ReadmeEntry]] = {}
+        for entry in self.entries:
+            grouped.setdefault(entry.section, []).append(entry)
+        return grouped
+
+
+def _entry_end(data: bytes, start: int) -> int:
+    """End of the entry starting at start: the next blank line, heading or end of file."""
+    end = data.find(b"\n\n", start)
+    heading = data.find(b"\n#", start)
+    ends = [pos for pos in (end, heading) if pos != -1]
+    return min(ends) if ends else len(data.rstrip(b"\n"))
+
+
+def scan_readme(content: Union[str, bytes]) -> ReadmeIndex:
+    """
+    Tokenize a README once and return its structured index.
+
+    Args:
+        content: README markdown (str, or UTF-8 bytes as fetched)
+
+    Returns:
+        ReadmeIndex
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    index = ReadmeIndex(data)
+    section = ""
+    entry = None
+    entry_end = -1
+    heading = None
+    heading_end = 0
+
+    def add_id(raw: bytes, position: int) -> None:
+        arxiv_id = canonical_arxiv_id(raw.decode("ascii"))
+        index.arxiv_ids.add(arxiv_id)
+        if entry is not None and not entry.arxiv_id and position < entry_end:
+            entry.arxiv_id = arxiv_id
+
+    def add_inline(match: re.Match, text: bytes, position: int) -> None:
+        # position: where the token's text starts in the README (for nested tokens, the enclosing token)
+        kind = match.lastgroup
+        if kind == "bold":
+            index.bold_markers += 2
+            raw = match.group("bold")
+            index.titles.add(normalize_title(raw.decode("utf-8")))
+            scan_nested(raw, position)
+        elif kind == "link_url":
+            link_text, url = match.group("link_text", "link_url")
+            index.links.append((link_text.decode("utf-8"), url.decode("utf-8")))
+            # Titles and IDs count in the text too: [**Title**](...), [arXiv:2210.02747](https://github.com/...)
+            scan_nested(link_text, position)
+            scan_nested(url, position)
+        elif kind in ("url_id", "tag_id"):
+            add_id(match.group(kind), position)
+        else:
+            run = len(match.group(kind))
+            index.bold_markers += run // 2
+            # Only a star standing alone is an italic marker, as in "*x*" (not "***x***")
+            start, end = match.span()
+            alone = (start == 0 or text[start - 1] != 0x2A) and (end == len(text) or text[end] != 0x2A)
+            index.single_stars += run == 1 and alone
+
+    def scan_nested(text: bytes, position: int) -> None:
+        for inner in _INLINE.finditer(text):
+            add_inline(inner, text, position)
+
+    for match in _TOKEN.finditer(data):
+        kind = match.lastgroup
+        if kind == "heading":
+            level = len(match.group("hashes"))
+            raw = match.group("heading")
+            text = raw.decode("utf-8")
+            if heading is not None:
+                heading.empty = data[heading_end:match.start()].strip() in (b"", b"---")
+            heading = ReadmeHeading(level, text, match.start())
+            heading_end = match.end()
+            index.headings.append(heading)
+            if level == 2:
+                section = text
+            entry = None
+            # "### Flow Matching https://arxiv.org/abs/2210.02747"
+            scan_nested(raw, match.start())
+            continue
+
+        start = match.start()
+        if kind == "bold" and (start == 0 or data[start - 1] == 0x0A):
+            title = match.group("bold").decode("utf-8").strip()
+            entry_end = _entry_end(data, start)
+            entry = ReadmeEntry(section, title, normalize_title(title), "", start, entry_end - start)
+            index.entries.append(entry)
+        add_inline(match, data, start)
+
+    if heading is not None:
+        heading.empty = data[heading_end:].strip() in (b"", b"---")
+
+    return index
+
+
+if __name__ == "__main__":
+    # Test scanning a small README
+    sample = """# Awesome Flow Matching
+
+## Foundational
+
+**Flow Matching for Generative Modeling** [[Paper](https://arxiv.org/abs/2210.02747v2)]
+
+**Rectified Flow** [arXiv:2209.03003](https://github.com/gnobitab/RectifiedFlow)
+"""
+    index = scan_readme(sample)
+    for entry in index.entries:
+        print(f"[{entry.section}] {entry.title} -> {entry.arxiv_id or '(no arXiv ID)'}")
+    print(f"arXiv IDs: {sorted(index.arxiv_ids)}")
+
+    # IDs in link text must be found, not only in link targets
+    assert scan_readme("[arXiv:2210.02747](https://github.com/x)").arxiv_ids == {"2210.02747"}
+    # Bold titles inside links, IDs inside headings, bold inside extra stars
+    linked = scan_readme("- [**Flow Matching for Generative Modeling**](https://arxiv.org/abs/2210.02747)")
+    assert linked.titles == {"flow matching for generative modeling"} and linked.arxiv_ids == {"2210.02747"}
+    assert scan_readme("### Flow Matching https://arxiv.org/abs/2210.02747").arxiv_ids == {"2210.02747"}
+    triple = scan_readme("***triple***")
+    assert triple.titles == {"triple"} and (triple.bold_markers, triple.single_stars) == (2, 0)
+    assert index.arxiv_ids == {"2210.02747", "2209.03003"}
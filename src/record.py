@@ -0,0 +1,151 @@
+"""Compact paper record shared by every source and pipeline stage."""
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+# New-style (2210.02747) and old-style (hep-th/9901001) IDs, optional version
+_ARXIV_ID_PATTERN = re.compile(r'(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?', re.IGNORECASE)
+
+
+def canonical_arxiv_id(raw: Optional[str]) -> str:
+    """
+    Canonical arXiv ID: no URL, no "arXiv:" prefix, no version suffix.
+
+    Accepts "2210.02747v3", "arXiv:2210.02747", "https://arxiv.org/abs/2210.02747v1"
+    and old-style IDs. Returns "" if no ID is found.
+    """
+    if not raw:
+        return ""
+    match = _ARXIV_ID_PATTERN.search(raw)
+    return match.group(1) if match else ""
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ""
+
+
+@dataclass(slots=True)
+class PaperRecord:
+    """
+    One candidate paper, as emitted by any source adapter.
+
+    arxiv_id is always canonical. Venue, source and author names are
+    interned, since the same strings repeat across thousands of records.
+    OpenAlex abstracts stay as the inverted index until .abstract is read.
+    """
+    title: str
+    arxiv_id: str = ""
+    authors: tuple[str, ...] = ()
+    abstract_text: str = ""
+    abstract_index: Optional[dict] = field(default=None, repr=False, compare=False)
+    published_date: Optional[datetime] = None  # arXiv submission date
+    updated_date: Optional[datetime] = None
+    publication_date: str = ""  # Venue publication date reported by the source
+    year: int = 0
+    citation_count: int = 0
+    venue: str = ""
+    categories: tuple[str, ...] = ()
+    doi: str = ""
+    source: str = ""
+    source_id: str = ""  # OpenAlex work ID or Semantic Scholar paperId
+    category: str = ""  # Set by the classifier
+    matched_terms: tuple[str, ...] = ()  # Search terms this record was found by
+
+    def __post_init__(self):
+        self.arxiv_id = canonical_arxiv_id(self.arxiv_id)
+        self.authors = tuple(_intern(a) for a in self.authors)
+        self.categories = tuple(_intern(c) for c in self.categories)
+        self.matched_terms = tuple(_intern(t) for t in self.matched_terms)
+        self.venue = _intern(self.venue)
+        self.source = _intern(self.source)
+
+    @property
+    def abstract(self) -> str:
+        """Abstract text, reconstructed from abstract_index on first read."""
+        if not self.abstract_text and self.abstract_index:
+            return abstract_for(self.source_id, self.abstract_index)
+        return self.abstract_text
+
+    @abstract.setter
+    def abstract(self, value: str) -> None:
+        self.abstract_text = value or ""
+        self.abstract_index = None
+
+    @property
+    def arxiv_url(self) -> str:
+        return f"https://arxiv.org/abs/{self.arxiv_id}" if self.arxiv_id else ""
+
+    @property
+    def pdf_url(self) -> str:
+        return f"https://arxiv.org/pdf/{self.arxiv_id}" if self.arxiv_id else ""
+
+
+def reconstruct_abstract(inverted_index: dict) -> str:
+    """Reconstruct abstract from OpenAlex inverted index format."""
+    if not inverted_index:
+        return ""
+
+    # Indexes are normally dense, so the token count is the abstract length
+    # and every word can be scattered straight into a preallocated list
+    words = [""] * sum(map(len, inverted_index.values()))
+    try:
+        for word, positions in inverted_index.items():
+            for pos in positions:
+                words[pos] = word
+    except IndexError:
+        return _reconstruct_sparse(inverted_index)
+
+    if not words[-1]:
+        # A position was listed twice, leaving a gap; size by max position instead
+        return _reconstruct_sparse(inverted_index)
+
+    return " ".join(words)
+
+
+def _reconstruct_sparse(inverted_index: dict) -> str:
+    """Reconstruct an index with gaps or repeated positions."""
+    max_pos = max((max(positions) for positions in inverted_index.values() if positions), default=-1)
+    words = [""] * (max_pos + 1)
+    for word, positions in inverted_index.items():
+        for pos in positions:
+            words[pos] = word
+    return " ".join(words)
+
+
+# Reconstructed abstracts by work ID, oldest dropped first past the limit
+ABSTRACT_CACHE_SIZE = 20000
+_abstract_cache: dict[str, str] = {}
+_abstract_cache_lock = threading.Lock()
+
+
+def abstract_for(work_id: str, inverted_index: Optional[dict]) -> str:
+    """
+    Return the abstract for a work, memoized by work ID.
+
+    Args:
+        work_id: OpenAlex work ID (memo key; empty IDs are not memoized)
+        inverted_index: The work's abstract_inverted_index, if fetched
+
+    Returns:
+        Abstract text ("" if there is no index)
+    """
+    if not inverted_index:
+        return ""
+
+    with _abstract_cache_lock:
+        cached = _abstract_cache.get(work_id)
+    if cached is not None:
+        return cached
+
+    abstract = reconstruct_abstract(inverted_index)
+    if work_id:
+        with _abstract_cache_lock:
+            _abstract_cache[work_id] = abstract
+            if len(_abstract_cache) > ABSTRACT_CACHE_SIZE:
+                del _abstract_cache[next(iter(_abstract_cache))]
+    return abstract
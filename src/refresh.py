@@ -0,0 +1,196 @@
+"""Citation refresh scheduler - decides which candidates' counts to look up."""
+from __future__ import annotations
+
+import math
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from record import PaperRecord
+from sources.openalex import CITATION_BATCH_SIZE
+from store import CitationState, PaperStore
+
+# Citations per day assumed for a paper with no observed growth, so that
+# even flat papers are eventually rechecked
+BASELINE_GROWTH = 0.02
+
+# Papers scoring below this are skipped (expected gain under 5% of the gap)
+MIN_SCORE = 0.05
+
+# Weight of the newest observation in the growth estimate
+GROWTH_SMOOTHING = 0.5
+
+
+@dataclass
+class RefreshPlan:
+    """Result of RefreshScheduler.plan."""
+    # Papers to look up, highest priority first
+    refresh: list[PaperRecord] = field(default_factory=list)
+    # Papers whose stored count already meets the threshold
+    known_above: list[tuple[PaperRecord, CitationState]] = field(default_factory=list)
+    # Skipped papers by reason: "far_below", "over_budget"
+    skipped: dict[str, int] = field(default_factory=dict)
+    # The over-budget papers themselves, to be kept for the next run (see defer)
+    deferred: list[PaperRecord] = field(default_factory=list)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Drop the timezone of an aware datetime after converting it to UTC."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class RefreshScheduler:
+    """
+    Prioritizes citation lookups for candidates that are not yet listed:
+    the stored ones from earlier runs (stored_candidates) plus this run's
+    new arrivals.
+
+    Each candidate is scored by the citations it is expected to have gained
+    since its last check (growth rate times staleness) relative to how many
+    it still needs to reach min_citations. Never-checked papers come first.
+    Papers already at the threshold are accepted from the store, papers
+    whose expected gain is negligible are skipped, and the rest are looked
+    up in priority order until the request budget is spent.
+    """
+
+    def __init__(
+        self,
+        store: PaperStore,
+        min_citations: int,
+        budget: Optional[int] = None,
+        batch_size: int = CITATION_BATCH_SIZE,
+        max_age_days: float = 30,
+        max_stored: Optional[int] = None
+    ):
+        """
+        Args:
+            store: Paper store holding citation history
+            min_citations: Inclusion threshold
+            budget: Lookup requests allowed per run (None for unlimited)
+            batch_size: Papers resolved per lookup request
+            max_age_days: Recheck any paper whose count is older than this
+            max_stored: Stored candidates considered per run, least recently
+                checked first (None for all)
+        """
+        self.store = store
+        self.min_citations = min_citations
+        self.budget = budget
+        self.batch_size = batch_size
+        self.max_age_days = max_age_days
+        self.max_stored = max_stored
+
+    def stored_candidates(self) -> list[PaperRecord]:
+        """
+        Unlisted candidates from earlier runs that are still below the threshold.
+
+        These are the papers the staleness and growth scores exist for: the
+        searches only return new papers once watermarks are in use, so
+        without them no paper would ever be checked twice.
+        """
+        return self.store.unlisted_below(self.min_citations, self.max_stored)
+
+    def score(self, state: Optional[CitationState], now: datetime) -> float:
+        """Priority of refreshing a paper; higher is more urgent."""
+        if state is None or state.checked_at is None:
+            return math.inf
+
+        age_days = max((now - state.checked_at).total_seconds() / 86400, 0.0)
+        if age_days >= self.max_age_days:
+            return math.inf
+
+        gap = self.min_citations - state.citation_count
+        expected_gain = max(state.growth_per_day, BASELINE_GROWTH) * age_days
+        return expected_gain / max(gap, 1)
+
+    def plan(self, papers: list[PaperRecord], now: Optional[datetime] = None) -> RefreshPlan:
+        """
+        Split candidates into lookups, known-above papers and skips.
+
+        Args:
+            papers: Candidate papers (canonical arXiv IDs)
+            now: Current time (defaults to now, UTC)
+
+        Returns:
+            RefreshPlan
+        """
+        now = now or datetime.utcnow()
+        states = self.store.citation_states(p.arxiv_id for p in papers)
+        plan = RefreshPlan()
+        scored = []
+
+        for paper in papers:
+            state = states.get(paper.arxiv_id)
+            if state and state.citation_count >= self.min_citations:
+                plan.known_above.append((paper, state))
+                continue
+            score = self.score(state, now)
+            if score < MIN_SCORE:
+                plan.skipped["far_below"] = plan.skipped.get("far_below", 0) + 1
+                continue
+            scored.append((score, paper))
+
+        # Stable sort keeps the source order among equal scores
+        scored.sort(key=lambda item: item[0], reverse=True)
+        limit = len(scored) if self.budget is None else self.budget * self.batch_size
+        plan.refresh = [paper for _, paper in scored[:limit]]
+        if len(scored) > limit:
+            plan.skipped["over_budget"] = len(scored) - limit
+            plan.deferred = [paper for _, paper in scored[limit:]]
+        return plan
+
+    def defer(self, papers: list[PaperRecord]) -> None:
+        """
+        Keep candidates that were not looked up this run (over budget, or their lookup failed).
+
+        They are stored unchecked, so stored_candidates() offers them first
+        next run; the watermarks have already moved past them.
+        """
+        if papers:
+            self.store.upsert_papers(papers)
+
+    def record(
+        self,
+        papers: list[PaperRecord],
+        results: dict[str, dict],
+        now: Optional[datetime] = None
+    ) -> None:
+        """
+        Store lookup results and update each paper's growth estimate.
+
+        Papers the lookup did not resolve are still marked as checked, so
+        they are not retried until their score recovers.
+
+        Args:
+            papers: Papers that were looked up
+            results: Lookup results by arXiv ID ({citation_count, venue})
+            now: Time of the lookup (defaults to now, UTC)
+        """
+        now = now or datetime.utcnow()
+        states = self.store.citation_states(p.arxiv_id for p in papers)
+        growth = {}
+
+        for paper in papers:
+            details = results.get(paper.arxiv_id)
+            state = states.get(paper.arxiv_id)
+            count = details.get("citation_count", 0) if details else 0
+            paper.citation_count = count
+            if details:
+                paper.venue = sys.intern(details.get("venue", "") or "")
+
+            if state and state.checked_at and not details:
+                growth[paper.arxiv_id] = state.growth_per_day
+            elif state and state.checked_at:
+                days = (now - state.checked_at).total_seconds() / 86400
+                observed = max(count - state.citation_count, 0) / max(days, 1 / 24)
+                growth[paper.arxiv_id] = (
+                    GROWTH_SMOOTHING * observed + (1 - GROWTH_SMOOTHING) * state.growth_per_day
+                )
+            elif paper.published_date:
+                # First check: average rate since publication
+                days = (now - _naive_utc(paper.published_date)).total_seconds() / 86400
+                growth[paper.arxiv_id] = count / max(days, 1)
+
+        self.store.record_citation_checks(papers, growth, now)
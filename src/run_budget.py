@@ -0,0 +1,113 @@
+"""Run-level wall-clock deadline and per-source request budgets."""
+from __future__ import annotations
+
+import threading
+import time
+import urllib.error
+from typing import Optional
+
+
+class BudgetExceededError(urllib.error.URLError):
+    """Raised instead of sending a request once the run's deadline or a source's budget is used up."""
+
+    def __init__(self, source: str, reason: str):
+        super().__init__(f"{source}: {reason}")
+        self.source = source
+
+
+class RunBudget:
+    """
+    Deadline for the whole run plus a cap on network requests per source.
+
+    transport charges every request it sends (cache hits are free), so
+    each stage stops making requests once its source is out of budget or
+    the deadline has passed. Stages order their work most valuable first,
+    and anything refused is recorded so the run can be reported as partial.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None, requests: Optional[dict[str, int]] = None):
+        """
+        Args:
+            deadline_seconds: Wall-clock seconds the run may take (None for no deadline)
+            requests: Maximum network requests per source (sources not listed are unlimited)
+        """
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.limits = dict(requests or {})
+        self.used: dict[str, int] = {}
+        self.refused: dict[str, int] = {}
+        self._notes: list[str] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None without a deadline)."""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def allows(self, source: str) -> bool:
+        """Whether a request for source would currently be allowed (without charging it)."""
+        with self._lock:
+            return self._refusal(source) is None
+
+    def charge(self, source: str) -> None:
+        """
+        Account one request for source.
+
+        Raises:
+            BudgetExceededError: The deadline has passed or source is out of requests
+        """
+        with self._lock:
+            reason = self._refusal(source)
+            if reason:
+                self.refused[source] = self.refused.get(source, 0) + 1
+                raise BudgetExceededError(source, reason)
+            self.used[source] = self.used.get(source, 0) + 1
+
+    def timeout(self, timeout: float) -> float:
+        """Cap a socket timeout so a request cannot run past the deadline."""
+        remaining = self.remaining()
+        return timeout if remaining is None else max(min(timeout, remaining), 1.0)
+
+    def note_partial(self, message: str) -> None:
+        """Record work a stage skipped for lack of time or budget."""
+        with self._lock:
+            self._notes.append(message)
+
+    @property
+    def partial(self) -> bool:
+        """True if any request was refused or a stage skipped work."""
+        with self._lock:
+            return bool(self.refused or self._notes)
+
+    def summary(self) -> list[str]:
+        """Human-readable lines describing what was cut short."""
+        with self._lock:
+            lines = [f"{source}: {count} requests refused" for source, count in sorted(self.refused.items())]
+            return lines + list(self._notes)
+
+    def _refusal(self, source: str) -> Optional[str]:
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "run deadline reached"
+        limit = self.limits.get(source)
+        if limit is not None and self.used.get(source, 0) >= limit:
+            return f"request budget of {limit} used up"
+        return None
+
+
+_budget = RunBudget()
+
+
+def configure_budget(deadline_seconds: Optional[float] = None, requests: Optional[dict[str, int]] = None) -> RunBudget:
+    """Replace the shared run budget (no arguments means unlimited)."""
+    global _budget
+    _budget = RunBudget(deadline_seconds, requests)
+    return _budget
+
+
+def get_budget() -> RunBudget:
+    """Return the shared run budget."""
+    return _budget
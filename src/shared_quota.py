@@ -0,0 +1,173 @@
+"""Token buckets shared by every updater process on a machine, kept in lock-protected files."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import urllib.error
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are still used, but only within this process
+    fcntl = None
+
+from concurrency import HOST_LIMITS
+
+# Reservations further out than this fail fast instead of blocking a worker thread
+MAX_BLOCKING_WAIT = 120.0
+
+
+@dataclass(frozen=True)
+class Quota:
+    """Sustained request rate for one host and how many requests may go out back to back."""
+    rate: float  # Requests per second
+    burst: float = 1.0
+
+
+def default_quotas() -> dict[str, Quota]:
+    """One quota per host with a politeness interval in concurrency.HOST_LIMITS."""
+    return {
+        host: Quota(rate=1 / limit.min_interval, burst=max(1.0, 1 / limit.min_interval))
+        for host, limit in HOST_LIMITS.items()
+        if limit.min_interval > 0
+    }
+
+
+class QuotaWaitError(urllib.error.URLError):
+    """Raised instead of reserving a slot that is further out than MAX_BLOCKING_WAIT."""
+
+    def __init__(self, host: str, wait: float):
+        super().__init__(f"shared quota for {host} is booked for the next {wait:.0f}s")
+        self.host = host
+        self.wait = wait
+
+
+class SharedTokenBucket:
+    """
+    Token bucket for one host whose state lives in a file.
+
+    Every process that points at the same file draws from the same bucket:
+    each request takes a token under an exclusive flock, and when the
+    bucket is empty it books the next free slot (the count goes negative)
+    and sleeps until then, so concurrent processes queue up instead of
+    racing. A 429/503 seen by any process holds every process off for the
+    Retry-After period, and the requests queued behind it resume one
+    interval apart after it ends.
+
+    State is {"tokens", "updated", "blocked_until"} with wall-clock times,
+    since monotonic clocks are not comparable across processes.
+    """
+
+    def __init__(self, path: Union[str, Path], host: str, quota: Quota):
+        self.path = Path(path)
+        self.host = host
+        self.quota = quota
+        self.stats = {"acquired": 0, "waited": 0.0, "rejected": 0}
+        self._local_lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def acquire(self) -> float:
+        """
+        Take a token, sleeping until the booked slot if the bucket is empty.
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            QuotaWaitError: The next free slot is more than MAX_BLOCKING_WAIT away
+        """
+        with self._locked() as state:
+            now = time.time()
+            tokens = self._refill(state, now)
+            # Slots are booked from the end of any Retry-After block, one interval apart
+            wait = max(state.get("blocked_until", 0.0) - now, 0.0)
+            if tokens < 1:
+                wait += (1 - tokens) / self.quota.rate
+            if wait > MAX_BLOCKING_WAIT:
+                self.stats["rejected"] += 1
+                raise QuotaWaitError(self.host, wait)
+            state["tokens"] = tokens - 1
+            self.stats["acquired"] += 1
+            self.stats["waited"] += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, retry_after: Optional[float]) -> None:
+        """Drain the bucket and hold every process off for retry_after seconds."""
+        with self._locked() as state:
+            now = time.time()
+            state["tokens"] = min(self._refill(state, now), 0.0)
+            if retry_after:
+                state["blocked_until"] = max(state.get("blocked_until", 0.0), now + retry_after)
+
+    def _refill(self, state: dict, now: float) -> float:
+        # No tokens accrue while a Retry-After block is in force
+        refill_from = max(state.get("updated", now), state.get("blocked_until", 0.0))
+        elapsed = max(now - refill_from, 0.0)
+        tokens = min(state.get("tokens", self.quota.burst) + elapsed * self.quota.rate, self.quota.burst)
+        state["updated"] = now
+        return tokens
+
+    @contextmanager
+    def _locked(self) -> Iterator[dict]:
+        """Yield the bucket state under the file lock; it is written back if the block succeeds."""
+        # The thread lock covers platforms without flock; closing the file drops the flock
+        with self._local_lock, open(self.path, "a+") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                # A torn or foreign file just resets the bucket
+                state = {}
+            yield state
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()
+
+
+_directory: Optional[Path] = None
+_quotas: dict[str, Quota] = {}
+_buckets: dict[str, SharedTokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def configure_quotas(directory: Optional[Union[str, Path]], quotas: Optional[dict[str, Quota]] = None) -> None:
+    """
+    Share request quotas through bucket files in directory (None disables sharing).
+
+    Args:
+        directory: Where the per-host bucket files live; every process that
+            should share quotas must use the same directory
+        quotas: Quota per host (defaults to default_quotas())
+    """
+    global _directory, _quotas
+    with _buckets_lock:
+        _directory = Path(directory) if directory else None
+        _quotas = default_quotas() if quotas is None else dict(quotas)
+        _buckets.clear()
+
+
+def get_bucket(host: str) -> Optional[SharedTokenBucket]:
+    """Return the shared bucket for a host (None if sharing is off or the host has no quota)."""
+    with _buckets_lock:
+        if _directory is None or host not in _quotas:
+            return None
+        if host not in _buckets:
+            _buckets[host] = SharedTokenBucket(_directory / f"{host}.json", host, _quotas[host])
+        return _buckets[host]
+
+
+def quota_stats() -> dict[str, dict]:
+    """This process's acquisitions and waits per host."""
+    with _buckets_lock:
+        buckets = list(_buckets.values())
+    return {b.host: dict(b.stats) for b in buckets}
@@ -1,47 +1,43 @@
 """arXiv API client for fetching flow matching papers."""
 from __future__ import annotations
 
-import urllib.request
+import queue
+import threading
 import urllib.parse
 import xml.etree.ElementTree as ET
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
-import time
-
-
-@dataclass
-class Paper:
-    """Represents a paper with metadata."""
-    title: str
-    authors: list[str]
-    abstract: str
-    arxiv_id: str
-    arxiv_url: str
-    pdf_url: str
-    published_date: datetime
-    updated_date: datetime
-    categories: list[str]
-    citation_count: Optional[int] = None
-    venue: Optional[str] = None
+from typing import IO, Callable, Collection, Iterator, Optional
 
+from concurrency import run_blocking
+from http_cache import cached_open
+from record import PaperRecord
+from run_budget import get_budget
 
-def search_arxiv(
-    search_terms: list[str],
-    max_results: int = 500,
-    days_back: Optional[int] = None
-) -> list[Paper]:
-    """
-    Search arXiv for papers matching the given search terms.
+API_HOST = "export.arxiv.org"
 
-    Args:
-        search_terms: List of terms to search for (OR'd together)
-        max_results: Maximum number of results to return
-        days_back: Only return papers from the last N days (None for all time)
+# Kept for callers that still import the old name
+Paper = PaperRecord
 
-    Returns:
-        List of Paper objects
-    """
+
+ARXIV_PAGE_SIZE = 100
+
+# Categories a paper must be listed in to count as a candidate
+ARXIV_CATEGORIES = ["cs.LG", "cs.CV", "cs.AI", "stat.ML", "cs.CL"]
+
+NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "arxiv": "http://arxiv.org/schemas/atom"
+}
+
+_ENTRY_TAG = f"{{{NS['atom']}}}entry"
+
+
+def _build_query(
+    search_terms: list[str],
+    date_range: Optional[tuple[datetime, datetime]] = None
+) -> str:
+    """Build the arXiv search_query for the terms, categories and optional date range."""
     # Build search query - search in title and abstract
     query_parts = []
     for term in search_terms:
@@ -52,105 +48,303 @@ def search_arxiv(
     query = " OR ".join(query_parts)
 
     # Add category filter for relevant categories
-    categories = ["cs.LG", "cs.CV", "cs.AI", "stat.ML", "cs.CL"]
-    cat_query = " OR ".join([f"cat:{cat}" for cat in categories])
+    cat_query = " OR ".join([f"cat:{cat}" for cat in ARXIV_CATEGORIES])
     query = f"({query}) AND ({cat_query})"
 
-    base_url = "http://export.arxiv.org/api/query"
-    params = {
-        "search_query": query,
-        "start": 0,
-        "max_results": max_results,
-        "sortBy": "submittedDate",
-        "sortOrder": "descending"
-    }
+    if date_range:
+        start, end = date_range
+        query += f" AND submittedDate:[{start:%Y%m%d%H%M} TO {end:%Y%m%d%H%M}]"
 
-    url = f"{base_url}?{urllib.parse.urlencode(params)}"
+    return query
 
-    papers = []
 
-    try:
-        with urllib.request.urlopen(url, timeout=30) as response:
-            data = response.read().decode("utf-8")
+def _parse_entry(entry: ET.Element) -> PaperRecord:
+    """Convert one Atom <entry> element into a PaperRecord."""
+    # Extract paper info
+    title_elem = entry.find("atom:title", NS)
+    title = title_elem.text.strip().replace("\n", " ") if title_elem is not None else ""
+
+    # Get authors
+    authors = []
+    for author in entry.findall("atom:author", NS):
+        name_elem = author.find("atom:name", NS)
+        if name_elem is not None:
+            authors.append(name_elem.text.strip())
+
+    # Get abstract
+    abstract_elem = entry.find("atom:summary", NS)
+    abstract = abstract_elem.text.strip().replace("\n", " ") if abstract_elem is not None else ""
+
+    # Get arxiv ID from id URL (PaperRecord drops the version suffix)
+    id_elem = entry.find("atom:id", NS)
+    arxiv_url = id_elem.text.strip() if id_elem is not None else ""
+    arxiv_id = arxiv_url.split("/abs/")[-1] if "/abs/" in arxiv_url else ""
+
+    # Get dates
+    published_elem = entry.find("atom:published", NS)
+    published_str = published_elem.text if published_elem is not None else ""
+    published_date = datetime.fromisoformat(published_str.replace("Z", "+00:00")) if published_str else datetime.now()
+
+    updated_elem = entry.find("atom:updated", NS)
+    updated_str = updated_elem.text if updated_elem is not None else ""
+    updated_date = datetime.fromisoformat(updated_str.replace("Z", "+00:00")) if updated_str else datetime.now()
+
+    # Get categories
+    categories = []
+    for cat in entry.findall("atom:category", NS):
+        term = cat.get("term", "")
+        if term:
+            categories.append(term)
+
+    return PaperRecord(
+        title=title,
+        authors=authors,
+        abstract_text=abstract,
+        arxiv_id=arxiv_id,
+        published_date=published_date,
+        updated_date=updated_date,
+        year=published_date.year,
+        categories=categories,
+        source="arxiv"
+    )
+
+
+def _iter_feed(stream: IO[bytes]) -> Iterator[PaperRecord]:
+    """Incrementally parse an Atom feed, discarding each entry once it is yielded."""
+    root = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            continue
+        if elem.tag == _ENTRY_TAG:
+            yield _parse_entry(elem)
+            # Drop the parsed entry so the tree never grows past one element
+            elem.clear()
+            root.remove(elem)
+
+
+def iter_arxiv(
+    search_terms: list[str],
+    max_results: Optional[int] = None,
+    days_back: Optional[int] = None,
+    date_range: Optional[tuple[datetime, datetime]] = None,
+    page_size: int = ARXIV_PAGE_SIZE
+) -> Iterator[PaperRecord]:
+    """
+    Stream arXiv search results page by page, newest submissions first.
+
+    Walks start/max_results windows and parses each response
+    incrementally. arXiv's 3-second request gap is kept by the shared
+    transport (rate controller and cross-process quota), so cached pages
+    are served without waiting.
+
+    Args:
+        search_terms: List of terms to search for (OR'd together)
+        max_results: Stop after this many papers (None for all)
+        days_back: Only return papers from the last N days (None for all time)
+        date_range: Optional (start, end) submittedDate window
+        page_size: Results per request
+
+    Yields:
+        PaperRecord objects
+
+    Raises:
+        urllib.error.URLError: A page could not be fetched (HTTP errors,
+            timeouts, an open circuit or the run budget); papers from
+            earlier pages have already been yielded
+    """
+    base_url = "http://export.arxiv.org/api/query"
+    query = _build_query(search_terms, date_range)
+
+    cutoff_date = None
+    if days_back:
+        cutoff_date = datetime.now() - timedelta(days=days_back)
 
-        # Parse XML
-        root = ET.fromstring(data)
+    start = 0
+    yielded = 0
 
-        # Define namespace
-        ns = {
-            "atom": "http://www.w3.org/2005/Atom",
-            "arxiv": "http://arxiv.org/schemas/atom"
+    while max_results is None or yielded < max_results:
+        batch = page_size if max_results is None else min(page_size, max_results - yielded)
+        params = {
+            "search_query": query,
+            "start": start,
+            "max_results": batch,
+            "sortBy": "submittedDate",
+            "sortOrder": "descending"
         }
+        url = f"{base_url}?{urllib.parse.urlencode(params)}"
 
-        cutoff_date = None
-        if days_back:
-            cutoff_date = datetime.now() - timedelta(days=days_back)
-
-        for entry in root.findall("atom:entry", ns):
-            # Extract paper info
-            title_elem = entry.find("atom:title", ns)
-            title = title_elem.text.strip().replace("\n", " ") if title_elem is not None else ""
-
-            # Get authors
-            authors = []
-            for author in entry.findall("atom:author", ns):
-                name_elem = author.find("atom:name", ns)
-                if name_elem is not None:
-                    authors.append(name_elem.text.strip())
-
-            # Get abstract
-            abstract_elem = entry.find("atom:summary", ns)
-            abstract = abstract_elem.text.strip().replace("\n", " ") if abstract_elem is not None else ""
-
-            # Get arxiv ID from id URL
-            id_elem = entry.find("atom:id", ns)
-            arxiv_url = id_elem.text.strip() if id_elem is not None else ""
-            arxiv_id = arxiv_url.split("/abs/")[-1] if "/abs/" in arxiv_url else ""
-
-            # Get PDF URL
-            pdf_url = ""
-            for link in entry.findall("atom:link", ns):
-                if link.get("title") == "pdf":
-                    pdf_url = link.get("href", "")
-                    break
-
-            # Get dates
-            published_elem = entry.find("atom:published", ns)
-            published_str = published_elem.text if published_elem is not None else ""
-            published_date = datetime.fromisoformat(published_str.replace("Z", "+00:00")) if published_str else datetime.now()
-
-            updated_elem = entry.find("atom:updated", ns)
-            updated_str = updated_elem.text if updated_elem is not None else ""
-            updated_date = datetime.fromisoformat(updated_str.replace("Z", "+00:00")) if updated_str else datetime.now()
-
-            # Get categories
-            categories = []
-            for cat in entry.findall("atom:category", ns):
-                term = cat.get("term", "")
-                if term:
-                    categories.append(term)
-
-            # Apply date filter
-            if cutoff_date and published_date.replace(tzinfo=None) < cutoff_date:
+        page_count = 0
+        reached_cutoff = False
+        with cached_open(url, source="arxiv", timeout=30) as response:
+            for paper in _iter_feed(response):
+                page_count += 1
+
+                # Apply date filter; results are sorted newest first
+                if cutoff_date and paper.published_date.replace(tzinfo=None) < cutoff_date:
+                    reached_cutoff = True
+                    continue
+
+                yield paper
+                yielded += 1
+                if max_results is not None and yielded >= max_results:
+                    return
+
+        if page_count < batch or reached_cutoff:
+            return
+        start += page_count
+
+
+def iter_arxiv_date_windows(
+    search_terms: list[str],
+    start_date: datetime,
+    end_date: datetime,
+    window_days: int = 30,
+    max_workers: int = 3,
+    page_size: int = ARXIV_PAGE_SIZE,
+    skip: Collection[str] = (),
+    on_window_done: Optional[Callable[[datetime, datetime], None]] = None
+) -> Iterator[PaperRecord]:
+    """
+    Harvest a long date range by splitting it into submittedDate windows.
+
+    Windows are paged in parallel worker threads; the transport's pacing
+    keeps the combined request rate within arXiv's limit. Records are
+    handed over through a queue of at most one page per worker as they
+    are parsed, so no window is ever held in memory whole.
+
+    Windows are submitted newest first, so a harvest cut short (e.g. by
+    the run's request budget) has the most recent papers. Window
+    boundaries are counted from start_date, so they line up across runs
+    and the caller can skip windows it finished before.
+
+    Args:
+        search_terms: List of terms to search for (OR'd together)
+        start_date: Start of the submission range
+        end_date: End of the submission range
+        window_days: Days per window
+        max_workers: Windows fetched at the same time
+        page_size: Results per request
+        skip: Start dates (YYYY-MM-DD) of windows not to fetch
+        on_window_done: Called with a window's (start, end) once all its
+            records have been yielded
+
+    Yields:
+        PaperRecord objects, interleaved across the windows being fetched
+
+    Raises:
+        urllib.error.URLError: A window's request failed or was refused
+            (windows reported done before it stay done)
+    """
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + timedelta(days=window_days), end_date)
+        # submittedDate ranges are inclusive at minute precision, so stop a minute short
+        inclusive_end = window_end if window_end == end_date else window_end - timedelta(minutes=1)
+        if window_start.date().isoformat() not in skip:
+            windows.append((window_start, inclusive_end))
+        window_start = window_end
+    windows.reverse()
+    if not windows:
+        return
+
+    records: queue.Queue = queue.Queue(maxsize=page_size * max_workers)
+    finished = object()
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        # Gives up once the consumer has stopped, so workers never block forever
+        while not stopped.is_set():
+            try:
+                records.put(item, timeout=0.5)
+                return True
+            except queue.Full:
                 continue
+        return False
+
+    def fetch_window(window: tuple[datetime, datetime]) -> None:
+        try:
+            for paper in iter_arxiv(search_terms, date_range=window, page_size=page_size):
+                if not put(paper):
+                    return
+        except Exception as e:
+            put(e)
+        else:
+            put((finished, window))
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    for window in windows:
+        executor.submit(fetch_window, window)
+    try:
+        remaining = len(windows)
+        while remaining:
+            item = records.get()
+            if isinstance(item, tuple) and item[0] is finished:
+                remaining -= 1
+                if on_window_done:
+                    on_window_done(*item[1])
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
 
-            paper = Paper(
-                title=title,
-                authors=authors,
-                abstract=abstract,
-                arxiv_id=arxiv_id,
-                arxiv_url=arxiv_url,
-                pdf_url=pdf_url,
-                published_date=published_date,
-                updated_date=updated_date,
-                categories=categories
-            )
-            papers.append(paper)
+def search_arxiv(
+    search_terms: list[str],
+    max_results: int = 500,
+    days_back: Optional[int] = None,
+    date_range: Optional[tuple[datetime, datetime]] = None
+) -> list[PaperRecord]:
+    """
+    Search arXiv for papers matching the given search terms.
 
+    Args:
+        search_terms: List of terms to search for (OR'd together)
+        max_results: Maximum number of results to return
+        days_back: Only return papers from the last N days (None for all time)
+        date_range: Optional (start, end) submittedDate window
+
+    Returns:
+        List of PaperRecord objects
+
+    Raises:
+        urllib.error.URLError: A page could not be fetched
+    """
+    return list(iter_arxiv(search_terms, max_results=max_results, days_back=days_back, date_range=date_range))
+
+
+def _collect(papers: Iterator[PaperRecord], what: str) -> list[PaperRecord]:
+    collected = []
+    try:
+        collected.extend(papers)
     except Exception as e:
-        print(f"Error fetching from arXiv: {e}")
+        # Keep what was fetched; a partial run keeps the watermarks, so the rest is fetched next run
+        print(f"Error fetching from arXiv ({what}): {e}")
+        get_budget().note_partial(f"arXiv {what} stopped after {len(collected)} papers")
+    return collected
+
+
+async def search_arxiv_async(
+    search_terms: list[str],
+    max_results: int = 500,
+    days_back: Optional[int] = None,
+    date_range: Optional[tuple[datetime, datetime]] = None
+) -> list[PaperRecord]:
+    """Async adapter for search_arxiv, limited per arXiv host; a failed page ends the search and marks the run partial."""
+    return await run_blocking(API_HOST, lambda: _collect(
+        iter_arxiv(search_terms, max_results=max_results, days_back=days_back, date_range=date_range),
+        "search"
+    ))
+
 
-    return papers
+async def search_arxiv_windows_async(*args, **kwargs) -> list[PaperRecord]:
+    """Async adapter for iter_arxiv_date_windows; a failed window ends the harvest and marks the run partial."""
+    return await run_blocking(API_HOST, lambda: _collect(iter_arxiv_date_windows(*args, **kwargs), "history harvest"))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+"""arXiv OAI-PMH harvester for bulk backfills of flow matching papers."""
+from __future__ import annotations
+
+import urllib.error
+import urllib.parse
+import xml.etree.ElementTree as ET
+import time
+from datetime import date, datetime
+from typing import IO, Iterator, Optional, Union
+
+from concurrency import run_blocking
+from http_cache import cached_open
+from record import PaperRecord
+from run_budget import BudgetExceededError, get_budget
+from sources.arxiv import ARXIV_CATEGORIES
+
+OAI_BASE_URL = "https://oaipmh.arxiv.org/oai"
+OAI_SETS = ["cs", "stat"]
+
+OAI_NS = "http://www.openarchives.org/OAI/2.0/"
+ARXIV_NS = "http://arxiv.org/OAI/arXiv/"
+
+_RECORD_TAG = f"{{{OAI_NS}}}record"
+_TOKEN_TAG = f"{{{OAI_NS}}}resumptionToken"
+_ERROR_TAG = f"{{{OAI_NS}}}error"
+
+# Attempts per page (same resumption token) before the harvest gives up
+OAI_PAGE_ATTEMPTS = 3
+OAI_RETRY_DELAY = 10
+
+
+class OAIHarvestError(urllib.error.URLError):
+    """A page kept failing; oai_set and token say where the harvest stopped."""
+
+    def __init__(self, reason, oai_set: str, token: Optional[str]):
+        super().__init__(reason)
+        self.oai_set = oai_set
+        self.token = token
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    """Whitespace-collapsed text of an element, or '' if missing."""
+    if elem is None or elem.text is None:
+        return ""
+    return " ".join(elem.text.split())
+
+
+def _parse_record(record: ET.Element) -> Optional[PaperRecord]:
+    """Convert one OAI-PMH <record> in arXiv metadata format into a PaperRecord."""
+    header = record.find(f"{{{OAI_NS}}}header")
+    if header is not None and header.get("status") == "deleted":
+        return None
+
+    meta = record.find(f"{{{OAI_NS}}}metadata/{{{ARXIV_NS}}}arXiv")
+    if meta is None:
+        return None
+
+    arxiv_id = _text(meta.find(f"{{{ARXIV_NS}}}id"))
+
+    authors = []
+    for author in meta.findall(f"{{{ARXIV_NS}}}authors/{{{ARXIV_NS}}}author"):
+        name = " ".join(filter(None, [
+            _text(author.find(f"{{{ARXIV_NS}}}forenames")),
+            _text(author.find(f"{{{ARXIV_NS}}}keyname")),
+            _text(author.find(f"{{{ARXIV_NS}}}suffix"))
+        ]))
+        if name:
+            authors.append(name)
+
+    created = _text(meta.find(f"{{{ARXIV_NS}}}created"))
+    updated = _text(meta.find(f"{{{ARXIV_NS}}}updated"))
+    published_date = datetime.fromisoformat(created) if created else datetime.now()
+    updated_date = datetime.fromisoformat(updated) if updated else published_date
+
+    return PaperRecord(
+        title=_text(meta.find(f"{{{ARXIV_NS}}}title")),
+        authors=authors,
+        abstract_text=_text(meta.find(f"{{{ARXIV_NS}}}abstract")),
+        arxiv_id=arxiv_id,
+        published_date=published_date,
+        updated_date=updated_date,
+        year=published_date.year,
+        categories=_text(meta.find(f"{{{ARXIV_NS}}}categories")).split(),
+        source="arxiv"
+    )
+
+
+def _iter_page(stream: IO[bytes], page: dict) -> Iterator[PaperRecord]:
+    """
+    Incrementally parse one ListRecords response.
+
+    Records are yielded and discarded as they are parsed; the resumption
+    token (if any) is stored in page["token"] once the stream ends.
+    """
+    # Open elements; records sit under <ListRecords>, not the root
+    stack = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        if elem.tag == _RECORD_TAG:
+            paper = _parse_record(elem)
+            # Drop the parsed record so the tree never grows past one element
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+            if paper:
+                yield paper
+        elif elem.tag == _TOKEN_TAG:
+            page["token"] = (elem.text or "").strip() or None
+        elif elem.tag == _ERROR_TAG:
+            # noRecordsMatch just means the window is empty
+            if elem.get("code") != "noRecordsMatch":
+                print(f"OAI-PMH error {elem.get('code')}: {_text(elem)}")
+
+
+def _matches(paper: PaperRecord, terms: list[str], categories: Optional[list[str]]) -> bool:
+    """Local stand-in for the search API's ti:/abs: phrase and cat: filters."""
+    if categories and not set(paper.categories) & set(categories):
+        return False
+    text = f"{paper.title} {paper.abstract}".lower()
+    return any(term in text for term in terms)
+
+
+def _format_date(value: Union[date, datetime, str]) -> str:
+    if isinstance(value, str):
+        return value
+    return value.strftime("%Y-%m-%d")
+
+
+def harvest_arxiv_oai(
+    search_terms: list[str],
+    from_date: Union[date, datetime, str],
+    until_date: Optional[Union[date, datetime, str]] = None,
+    sets: Optional[list[str]] = None,
+    categories: Optional[list[str]] = ARXIV_CATEGORIES,
+    base_url: str = OAI_BASE_URL
+) -> Iterator[PaperRecord]:
+    """
+    Stream arXiv records via OAI-PMH and keep those matching search_terms.
+
+    Walks ListRecords for each set with resumption tokens, parsing pages
+    incrementally, and filters locally on title/abstract and categories.
+    Request spacing and 503 "retry after" waits are handled by the shared
+    transport. A page that fails is requested again with the same
+    resumption token (records already yielded are skipped); after
+    OAI_PAGE_ATTEMPTS failures the harvest raises OAIHarvestError.
+
+    Args:
+        search_terms: Terms to match in title or abstract (case-insensitive)
+        from_date: First datestamp to harvest (YYYY-MM-DD)
+        until_date: Last datestamp to harvest (None for today)
+        sets: OAI sets to walk (defaults to cs and stat)
+        categories: Keep only papers listed in one of these (None for any)
+        base_url: OAI-PMH endpoint (point at a local server to replay pages)
+
+    Yields:
+        PaperRecord objects, in harvest order
+
+    Raises:
+        OAIHarvestError: A page could not be fetched; says where to resume
+    """
+    terms = [" ".join(term.lower().replace('"', "").split()) for term in search_terms]
+    seen = set()
+
+    for oai_set in sets or OAI_SETS:
+        params = {
+            "verb": "ListRecords",
+            "metadataPrefix": "arXiv",
+            "set": oai_set,
+            "from": _format_date(from_date)
+        }
+        if until_date:
+            params["until"] = _format_date(until_date)
+
+        attempt = 1
+        while params:
+            url = f"{base_url}?{urllib.parse.urlencode(params)}"
+            page = {"token": None}
+
+            try:
+                with cached_open(url, source="arxiv", timeout=60) as response:
+                    for paper in _iter_page(response, page):
+                        # Cross-listed papers (and records of a retried page) appear more than once
+                        if paper.arxiv_id in seen or not _matches(paper, terms, categories):
+                            continue
+                        seen.add(paper.arxiv_id)
+                        yield paper
+            except Exception as e:
+                token = params.get("resumptionToken")
+                if isinstance(e, BudgetExceededError) or attempt >= OAI_PAGE_ATTEMPTS:
+                    raise OAIHarvestError(e, oai_set, token) from e
+                print(f"Error harvesting arXiv OAI-PMH ({e}); attempt {attempt + 1}/{OAI_PAGE_ATTEMPTS}")
+                attempt += 1
+                time.sleep(OAI_RETRY_DELAY)
+                continue
+
+            attempt = 1
+            # Resumption requests carry only the verb and the token
+            params = {"verb": "ListRecords", "resumptionToken": page["token"]} if page["token"] else None
+
+
+def _collect(*args, **kwargs) -> list[PaperRecord]:
+    papers = []
+    try:
+        papers.extend(harvest_arxiv_oai(*args, **kwargs))
+    except OAIHarvestError as e:
+        # Keep what was harvested; a partial run keeps the watermarks for the next one
+        print(f"arXiv OAI-PMH harvest stopped in set {e.oai_set} (resumption token {e.token}): {e.reason}")
+        get_budget().note_partial(f"arXiv OAI-PMH harvest stopped in set {e.oai_set}")
+    return papers
+
+
+async def harvest_arxiv_oai_async(*args, **kwargs) -> list[PaperRecord]:
+    """Async adapter for harvest_arxiv_oai; collects the matching papers (up to a failure)."""
+    host = urllib.parse.urlparse(kwargs.get("base_url", OAI_BASE_URL)).netloc
+    return await run_blocking(host, lambda: _collect(*args, **kwargs))
+
+
+if __name__ == "__main__":
+    # Test a one-day harvest
+    papers = list(harvest_arxiv_oai(["flow matching", "rectified flow"], "2024-06-03", "2024-06-03"))
+    print(f"Found {len(papers)} papers")
+    for p in papers[:3]:
+        print(f"- {p.title} ({p.arxiv_id})")
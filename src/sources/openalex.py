@@ -1,144 +1,341 @@
 """OpenAlex API client - free alternative for citation counts."""
 from __future__ import annotations
 
-import urllib.request
+import asyncio
+import urllib.error
 import urllib.parse
 import json
-import time
-from dataclasses import dataclass
-from typing import Optional
+import re
+from datetime import datetime
+from typing import Iterator, Optional, Union
 
+from concurrency import run_blocking
+from http_cache import cached_fetch
+from record import PaperRecord, canonical_arxiv_id, reconstruct_abstract
 
-@dataclass
-class OpenAlexPaper:
-    """Paper metadata from OpenAlex."""
-    openalex_id: str
-    title: str
-    authors: list[str]
-    abstract: str
-    year: int
-    citation_count: int
-    venue: str
-    arxiv_id: Optional[str]
-    doi: Optional[str]
+API_HOST = "api.openalex.org"
+
+# Kept for callers that still import the old name. reconstruct_abstract
+# (now in record) is imported above for the same reason.
+OpenAlexPaper = PaperRecord
+
+
+# OpenAlex caps per_page at 200
+MAX_PER_PAGE = 200
+
+# OpenAlex accepts at most 50 OR'd values in a single filter
+CITATION_BATCH_SIZE = 50
+
+# Fields needed to filter and dedup search hits; authorships and the
+# abstract_inverted_index are fetched later by fetch_openalex_details
+SEARCH_FIELDS = [
+    "id", "doi", "title", "publication_year", "cited_by_count",
+    "updated_date", "primary_location", "locations"
+]
+
+DETAIL_FIELDS = ["id", "authorships", "abstract_inverted_index"]
+
+
+def _search_filter(
+    query: Union[str, list[str]],
+    min_citation_count: int = 0,
+    year_from: Optional[int] = None,
+    from_updated_date: Optional[str] = None
+) -> str:
+    """Build the works filter string for a title/abstract search (a list of phrases is OR'd)."""
+    phrases = [query] if isinstance(query, str) else query
+    filters = ["title_and_abstract.search:" + "|".join(f'"{phrase}"' for phrase in phrases)]
+    if min_citation_count > 0:
+        filters.append(f"cited_by_count:>{min_citation_count - 1}")
+    if year_from:
+        filters.append(f"publication_year:>{year_from - 1}")
+    if from_updated_date:
+        filters.append(f"from_updated_date:{from_updated_date}")
+    return ",".join(filters)
+
+
+def _parse_updated_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse OpenAlex's updated_date (ISO timestamp, sometimes without a time)."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _parse_work(item: dict) -> PaperRecord:
+    """Convert one OpenAlex work object into a PaperRecord."""
+    # Extract authors
+    authors = []
+    for authorship in item.get("authorships", []):
+        author = authorship.get("author", {})
+        name = author.get("display_name", "")
+        if name:
+            authors.append(name)
+
+    # Extract arXiv ID from locations
+    arxiv_id = ""
+    for location in item.get("locations", []):
+        source = location.get("source", {}) or {}
+        if source.get("type") == "repository":
+            pdf_url = location.get("pdf_url", "") or ""
+            landing_url = location.get("landing_page_url", "") or ""
+            for url in [pdf_url, landing_url]:
+                if "arxiv.org" in url:
+                    # Extract arXiv ID
+                    match = re.search(r'(\d{4}\.\d{4,5})', url)
+                    if match:
+                        arxiv_id = match.group(1)
+                        break
+
+    # Get venue
+    venue = ""
+    primary_location = item.get("primary_location", {}) or {}
+    source = primary_location.get("source", {}) or {}
+    venue = source.get("display_name", "") or ""
+
+    return PaperRecord(
+        title=item.get("title", "") or "",
+        arxiv_id=arxiv_id,
+        authors=authors,
+        # Kept as-is; only papers whose .abstract is read pay for reconstruction
+        abstract_index=item.get("abstract_inverted_index") or None,
+        updated_date=_parse_updated_date(item.get("updated_date")),
+        year=item.get("publication_year", 0) or 0,
+        citation_count=item.get("cited_by_count", 0) or 0,
+        venue=venue,
+        doi=item.get("doi", "") or "",
+        source="openalex",
+        source_id=item.get("id", "") or ""
+    )
+
+
+def iter_openalex(
+    query: Union[str, list[str]],
+    max_results: Optional[int] = None,
+    min_citation_count: int = 0,
+    year_from: Optional[int] = None,
+    per_page: int = MAX_PER_PAGE,
+    from_updated_date: Optional[str] = None,
+    select: Optional[list[str]] = None
+) -> Iterator[PaperRecord]:
+    """
+    Stream OpenAlex search results, following cursor pagination.
+
+    Only one page of JSON is held at a time, so memory is bounded by
+    per_page rather than by the number of results.
+
+    Args:
+        query: Search phrase, or a list of phrases matched with OR
+        max_results: Stop after this many papers (None for all)
+        min_citation_count: Minimum citation count filter
+        year_from: Only include papers from this year onwards
+        per_page: Results per request (max 200)
+        from_updated_date: Only works updated on/after this date (YYYY-MM-DD).
+            This filter needs an OpenAlex Premium key; if the request is
+            rejected, the full query runs instead.
+        select: Root-level fields to request (None for full works). Fields
+            left out come back empty on the PaperRecord.
+
+    Yields:
+        PaperRecord objects, most cited first
+    """
+    base_url = "https://api.openalex.org/works"
+    params = {
+        "filter": _search_filter(query, min_citation_count, year_from, from_updated_date),
+        "per_page": min(per_page, MAX_PER_PAGE),
+        "sort": "cited_by_count:desc",
+        "mailto": "awesome-flow-matching@example.com"  # Polite pool
+    }
+    if select:
+        params["select"] = ",".join(select)
+
+    cursor = "*"
+    yielded = 0
+
+    while cursor:
+        if max_results is not None:
+            remaining = max_results - yielded
+            if remaining <= 0:
+                return
+            params["per_page"] = min(per_page, MAX_PER_PAGE, remaining)
+        params["cursor"] = cursor
+
+        url = f"{base_url}?{urllib.parse.urlencode(params)}"
+
+        try:
+            data = json.loads(cached_fetch(url, source="openalex", timeout=30).decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if from_updated_date and cursor == "*" and 400 <= e.code < 500 and e.code != 429:
+                # from_updated_date is a Premium (API key) filter; without a key the
+                # filtered query is rejected, so run the full query instead
+                print(f"OpenAlex rejected from_updated_date ({e.code}); searching without it")
+                from_updated_date = None
+                params["filter"] = _search_filter(query, min_citation_count, year_from)
+                continue
+            print(f"Error fetching from OpenAlex: {e}")
+            return
+        except Exception as e:
+            print(f"Error fetching from OpenAlex: {e}")
+            return
+
+        results = data.get("results", [])
+        cursor = (data.get("meta", {}) or {}).get("next_cursor") if results else None
+        del data
+
+        for item in results:
+            yield _parse_work(item)
+            yielded += 1
 
 
 def search_openalex(
-    query: str,
+    query: Union[str, list[str]],
     limit: int = 100,
     min_citation_count: int = 0,
-    year_from: Optional[int] = None
-) -> list[OpenAlexPaper]:
+    year_from: Optional[int] = None,
+    from_updated_date: Optional[str] = None,
+    select: Optional[list[str]] = None
+) -> list[PaperRecord]:
     """
     Search OpenAlex for papers. Free API, no auth required.
 
     Args:
-        query: Search query string
+        query: Search phrase, or a list of phrases matched with OR
         limit: Maximum number of results
         min_citation_count: Minimum citation count filter
         year_from: Only include papers from this year onwards
+        from_updated_date: Only works updated on/after this date (YYYY-MM-DD)
+        select: Root-level fields to request (None for full works)
 
     Returns:
-        List of OpenAlexPaper objects
+        List of PaperRecord objects
     """
-    base_url = "https://api.openalex.org/works"
+    return list(iter_openalex(
+        query,
+        max_results=limit,
+        min_citation_count=min_citation_count,
+        year_from=year_from,
+        from_updated_date=from_updated_date,
+        select=select
+    ))
+
+
+def fetch_openalex_details(
+    openalex_ids: list[str],
+    batch_size: int = CITATION_BATCH_SIZE
+) -> dict[str, dict]:
+    """
+    Fetch author lists and abstracts for works found with SEARCH_FIELDS.
 
-    # Build filter
-    filters = [f'title_and_abstract.search:"{query}"']
-    if min_citation_count > 0:
-        filters.append(f"cited_by_count:>{min_citation_count - 1}")
-    if year_from:
-        filters.append(f"publication_year:>{year_from - 1}")
+    Resolves up to batch_size works per request with an OR'd openalex_id:
+    filter, selecting only DETAIL_FIELDS.
 
-    params = {
-        "filter": ",".join(filters),
-        "per_page": min(limit, 200),
-        "sort": "cited_by_count:desc",
-        "mailto": "awesome-flow-matching@example.com"  # Polite pool
-    }
-
-    url = f"{base_url}?{urllib.parse.urlencode(params)}"
-    papers = []
+    Args:
+        openalex_ids: OpenAlex work IDs or URLs (e.g. "https://openalex.org/W123")
+        batch_size: Works per request (max 50)
 
-    try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
+    Returns:
+        Dict mapping the ID as given to {authors, abstract}. Works that
+        could not be fetched are absent.
+    """
+    by_short_id = {work_id.rsplit("/", 1)[-1]: work_id for work_id in dict.fromkeys(openalex_ids) if work_id}
+    short_ids = list(by_short_id)
+    results = {}
+
+    for start in range(0, len(short_ids), batch_size):
+        batch = short_ids[start:start + batch_size]
+        params = {
+            "filter": "openalex_id:" + "|".join(batch),
+            "select": ",".join(DETAIL_FIELDS),
+            "per_page": len(batch),
+            "mailto": "awesome-flow-matching@example.com"
+        }
+        url = f"https://api.openalex.org/works?{urllib.parse.urlencode(params)}"
 
-        with urllib.request.urlopen(req, timeout=30) as response:
-            data = json.loads(response.read().decode("utf-8"))
+        try:
+            data = json.loads(cached_fetch(url, source="openalex", timeout=30).decode("utf-8"))
+        except Exception as e:
+            print(f"Error fetching OpenAlex details for {len(batch)} works: {e}")
+            continue
 
         for item in data.get("results", []):
-            # Extract authors
-            authors = []
-            for authorship in item.get("authorships", []):
-                author = authorship.get("author", {})
-                name = author.get("display_name", "")
-                if name:
-                    authors.append(name)
-
-            # Extract arXiv ID from locations
-            arxiv_id = None
-            for location in item.get("locations", []):
-                source = location.get("source", {}) or {}
-                if source.get("type") == "repository":
-                    pdf_url = location.get("pdf_url", "") or ""
-                    landing_url = location.get("landing_page_url", "") or ""
-                    for url in [pdf_url, landing_url]:
-                        if "arxiv.org" in url:
-                            # Extract arXiv ID
-                            import re
-                            match = re.search(r'(\d{4}\.\d{4,5})', url)
-                            if match:
-                                arxiv_id = match.group(1)
-                                break
-
-            # Get venue
-            venue = ""
-            primary_location = item.get("primary_location", {}) or {}
-            source = primary_location.get("source", {}) or {}
-            venue = source.get("display_name", "") or ""
-
-            # Get abstract
-            abstract_inverted = item.get("abstract_inverted_index", {}) or {}
-            abstract = reconstruct_abstract(abstract_inverted) if abstract_inverted else ""
-
-            paper = OpenAlexPaper(
-                openalex_id=item.get("id", ""),
-                title=item.get("title", "") or "",
-                authors=authors,
-                abstract=abstract,
-                year=item.get("publication_year", 0) or 0,
-                citation_count=item.get("cited_by_count", 0) or 0,
-                venue=venue,
-                arxiv_id=arxiv_id,
-                doi=item.get("doi", "")
-            )
-            papers.append(paper)
+            work_id = by_short_id.get((item.get("id") or "").rsplit("/", 1)[-1])
+            if not work_id:
+                continue
+            detail = _parse_work(item)
+            results[work_id] = {"authors": detail.authors, "abstract": detail.abstract}
 
-    except Exception as e:
-        print(f"Error fetching from OpenAlex: {e}")
+    return results
+
+
+def get_citation_counts_openalex(
+    arxiv_ids: list[str],
+    batch_size: int = CITATION_BATCH_SIZE
+) -> dict[str, dict]:
+    """
+    Get citation counts from OpenAlex for many arXiv IDs at once.
+
+    Resolves up to batch_size IDs per request with an OR'd doi: filter
+    on the arXiv DOIs (10.48550/arXiv.<id>).
+
+    Args:
+        arxiv_ids: arXiv IDs (version suffixes are ignored)
+        batch_size: Number of IDs per request (max 50)
+
+    Returns:
+        Dict mapping clean arXiv ID to {citation_count, venue}. IDs that
+        OpenAlex does not know (or whose batch failed) are absent.
+    """
+    clean_ids = list(dict.fromkeys(filter(None, map(canonical_arxiv_id, arxiv_ids))))
+    results = {}
+
+    for start in range(0, len(clean_ids), batch_size):
+        results.update(_fetch_citation_batch(clean_ids[start:start + batch_size]) or {})
 
-    return papers
+    return results
 
 
-def reconstruct_abstract(inverted_index: dict) -> str:
-    """Reconstruct abstract from OpenAlex inverted index format."""
-    if not inverted_index:
-        return ""
+def _fetch_citation_batch(clean_ids: list[str]) -> Optional[dict[str, dict]]:
+    """Resolve one batch of clean arXiv IDs through the works doi: filter. Returns None if the request failed."""
+    # OpenAlex returns DOIs lowercased, so match on the lowercase form
+    by_doi = {f"https://doi.org/10.48550/arxiv.{arxiv_id}".lower(): arxiv_id for arxiv_id in clean_ids}
 
-    # Find max position
-    max_pos = 0
-    for positions in inverted_index.values():
-        if positions:
-            max_pos = max(max_pos, max(positions))
+    params = {
+        "filter": "doi:" + "|".join(by_doi),
+        "select": "doi,cited_by_count,primary_location",
+        "per_page": 200,
+        "mailto": "awesome-flow-matching@example.com"
+    }
+    url = f"https://api.openalex.org/works?{urllib.parse.urlencode(params)}"
+    results = {}
+
+    try:
+        data = json.loads(cached_fetch(url, source="openalex", timeout=30).decode("utf-8"))
+
+        for item in data.get("results", []):
+            arxiv_id = by_doi.get((item.get("doi") or "").lower())
+            if not arxiv_id:
+                continue
 
-    # Reconstruct
-    words = [""] * (max_pos + 1)
-    for word, positions in inverted_index.items():
-        for pos in positions:
-            words[pos] = word
+            citation_count = item.get("cited_by_count", 0) or 0
+            # Keep the better-cited work if OpenAlex has duplicates for a DOI
+            if arxiv_id in results and results[arxiv_id]["citation_count"] >= citation_count:
+                continue
 
-    return " ".join(words)
+            primary_location = item.get("primary_location", {}) or {}
+            source = primary_location.get("source", {}) or {}
+
+            results[arxiv_id] = {
+                "citation_count": citation_count,
+                "venue": source.get("display_name", "") or ""
+            }
+
+    except Exception as e:
+        print(f"Error getting OpenAlex data for {len(clean_ids)} IDs: {e}")
+        return None
+
+    return results
 
 
 def get_citation_count_openalex(arxiv_id: str) -> Optional[dict]:
@@ -151,40 +348,49 @@ def get_citation_count_openalex(arxiv_id: str) -> Optional[dict]:
     Returns:
         Dict with citation_count and venue, or None
     """
-    clean_id = arxiv_id.split("v")[0] if "v" in arxiv_id else arxiv_id
+    clean_id = canonical_arxiv_id(arxiv_id)
+    return get_citation_counts_openalex([clean_id]).get(clean_id)
 
-    # OpenAlex uses DOI format for arXiv papers
-    doi = f"https://doi.org/10.48550/arXiv.{clean_id}"
-    encoded_doi = urllib.parse.quote(doi, safe="")
-    url = f"https://api.openalex.org/works/{encoded_doi}?mailto=awesome-flow-matching@example.com"
 
-    try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
+async def search_openalex_async(*args, **kwargs) -> list[PaperRecord]:
+    """Async adapter for search_openalex, limited per OpenAlex host."""
+    return await run_blocking(API_HOST, search_openalex, *args, **kwargs)
 
-        with urllib.request.urlopen(req, timeout=15) as response:
-            item = json.loads(response.read().decode("utf-8"))
 
-        venue = ""
-        primary_location = item.get("primary_location", {}) or {}
-        source = primary_location.get("source", {}) or {}
-        venue = source.get("display_name", "") or ""
+async def fetch_openalex_details_async(*args, **kwargs) -> dict[str, dict]:
+    """Async adapter for fetch_openalex_details, limited per OpenAlex host."""
+    return await run_blocking(API_HOST, fetch_openalex_details, *args, **kwargs)
 
-        return {
-            "citation_count": item.get("cited_by_count", 0) or 0,
-            "venue": venue
-        }
 
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
-            # Try searching by title as fallback
-            pass
-        else:
-            print(f"Error getting OpenAlex data: {e}")
-    except Exception as e:
-        print(f"Error getting OpenAlex data: {e}")
+async def get_citation_count_openalex_async(arxiv_id: str) -> Optional[dict]:
+    """Async adapter for get_citation_count_openalex, limited per OpenAlex host."""
+    return await run_blocking(API_HOST, get_citation_count_openalex, arxiv_id)
 
-    return None
+
+async def get_citation_counts_openalex_async(
+    arxiv_ids: list[str],
+    batch_size: int = CITATION_BATCH_SIZE,
+    checked: Optional[set[str]] = None
+) -> dict[str, dict]:
+    """
+    Async adapter for get_citation_counts_openalex; batches run concurrently.
+
+    If checked is given, the IDs of every batch that was actually answered
+    (found or not) are added to it, so callers can tell misses from
+    batches that failed or were refused by the run budget.
+    """
+    clean_ids = list(dict.fromkeys(filter(None, map(canonical_arxiv_id, arxiv_ids))))
+    batches = [clean_ids[i:i + batch_size] for i in range(0, len(clean_ids), batch_size)]
+    results = {}
+    for batch, batch_result in zip(batches, await asyncio.gather(*(
+        run_blocking(API_HOST, _fetch_citation_batch, batch) for batch in batches
+    ))):
+        if batch_result is None:
+            continue
+        results.update(batch_result)
+        if checked is not None:
+            checked.update(batch)
+    return results
 
 
 if __name__ == "__main__":
@@ -1,28 +1,51 @@
 """Semantic Scholar API client for fetching citation counts and paper metadata."""
 from __future__ import annotations
 
-import urllib.request
+import urllib.error
 import urllib.parse
 import json
-import time
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
-
-
-@dataclass
-class SemanticScholarPaper:
-    """Paper metadata from Semantic Scholar."""
-    paper_id: str
-    title: str
-    authors: list[str]
-    abstract: str
-    year: int
-    citation_count: int
-    venue: str
-    arxiv_id: Optional[str]
-    url: str
-    publication_date: Optional[str]
+from typing import Iterator, Optional, Union
+
+from concurrency import run_blocking
+from http_cache import cached_fetch
+from record import PaperRecord, canonical_arxiv_id
+
+API_HOST = "api.semanticscholar.org"
+
+# Kept for callers that still import the old name
+SemanticScholarPaper = PaperRecord
+
+SEARCH_FIELDS = "paperId,title,authors,abstract,year,citationCount,venue,externalIds,url,publicationDate"
+
+# /paper/search/bulk returns up to 1000 papers per page
+BULK_PAGE_SIZE = 1000
+
+
+def _parse_paper(item: dict) -> PaperRecord:
+    """Convert one Semantic Scholar paper object into a PaperRecord."""
+    # Extract authors
+    authors = []
+    for author in item.get("authors", []):
+        name = author.get("name", "")
+        if name:
+            authors.append(name)
+
+    # Extract arXiv ID if available
+    external_ids = item.get("externalIds", {}) or {}
+
+    return PaperRecord(
+        title=item.get("title", "") or "",
+        arxiv_id=external_ids.get("ArXiv") or "",
+        authors=authors,
+        abstract_text=item.get("abstract", "") or "",
+        publication_date=item.get("publicationDate") or "",
+        year=item.get("year", 0) or 0,
+        citation_count=item.get("citationCount", 0) or 0,
+        venue=item.get("venue", "") or "",
+        doi=external_ids.get("DOI", "") or "",
+        source="semantic_scholar",
+        source_id=item.get("paperId", "") or ""
+    )
 
 
 def search_semantic_scholar(
@@ -30,173 +53,293 @@ def search_semantic_scholar(
     limit: int = 100,
     min_citation_count: int = 0,
     year_from: Optional[int] = None,
-    max_retries: int = 3
-) -> list[SemanticScholarPaper]:
+    publication_date_from: Optional[str] = None
+) -> list[PaperRecord]:
     """
-    Search Semantic Scholar for papers.
+    Search Semantic Scholar for papers (relevance search, top 100 only).
+
+    For every match, use search_semantic_scholar_bulk.
+
+    Rate limits are handled by the shared transport, which paces requests
+    and retries 429s as Retry-After asks; a query still throttled after
+    that is given up on rather than blocking the run.
 
     Args:
         query: Search query string
         limit: Maximum number of results
         min_citation_count: Minimum citation count filter
         year_from: Only include papers from this year onwards
-        max_retries: Maximum number of retries on rate limit
+        publication_date_from: Only papers published on/after this date (YYYY-MM-DD)
 
     Returns:
-        List of SemanticScholarPaper objects
+        List of PaperRecord objects
     """
     base_url = "https://api.semanticscholar.org/graph/v1/paper/search"
 
-    fields = "paperId,title,authors,abstract,year,citationCount,venue,externalIds,url,publicationDate"
-
     params = {
         "query": query,
         "limit": min(limit, 100),  # API max is 100 per request
-        "fields": fields
+        "fields": SEARCH_FIELDS
     }
 
     if year_from:
         params["year"] = f"{year_from}-"
+    if publication_date_from:
+        params["publicationDateOrYear"] = f"{publication_date_from}:"
 
     url = f"{base_url}?{urllib.parse.urlencode(params)}"
 
     papers = []
 
-    for attempt in range(max_retries):
-        try:
-            req = urllib.request.Request(url)
-            req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
-
-            with urllib.request.urlopen(req, timeout=30) as response:
-                data = json.loads(response.read().decode("utf-8"))
-
-            for item in data.get("data", []):
-                citation_count = item.get("citationCount", 0) or 0
-
-                # Apply citation filter
-                if citation_count < min_citation_count:
-                    continue
-
-                # Extract authors
-                authors = []
-                for author in item.get("authors", []):
-                    name = author.get("name", "")
-                    if name:
-                        authors.append(name)
-
-                # Extract arXiv ID if available
-                external_ids = item.get("externalIds", {}) or {}
-                arxiv_id = external_ids.get("ArXiv")
-
-                paper = SemanticScholarPaper(
-                    paper_id=item.get("paperId", ""),
-                    title=item.get("title", ""),
-                    authors=authors,
-                    abstract=item.get("abstract", "") or "",
-                    year=item.get("year", 0) or 0,
-                    citation_count=citation_count,
-                    venue=item.get("venue", "") or "",
-                    arxiv_id=arxiv_id,
-                    url=item.get("url", ""),
-                    publication_date=item.get("publicationDate")
-                )
-                papers.append(paper)
-
-            return papers  # Success, return results
+    try:
+        data = json.loads(cached_fetch(url, source="semantic_scholar", timeout=30).decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        if e.code == 429:
+            print("Rate limited by Semantic Scholar, giving up on this query")
+        else:
+            print(f"HTTP error from Semantic Scholar: {e}")
+        return papers
+    except Exception as e:
+        print(f"Error fetching from Semantic Scholar: {e}")
+        return papers
+
+    for item in data.get("data", []):
+        # Apply citation filter
+        if (item.get("citationCount", 0) or 0) < min_citation_count:
+            continue
+        papers.append(_parse_paper(item))
 
+    return papers
+
+
+def bulk_query(terms: Union[str, list[str]]) -> str:
+    """Bulk search query matching any of the terms as exact phrases."""
+    phrases = [terms] if isinstance(terms, str) else terms
+    return " | ".join('"' + phrase.replace('"', "") + '"' for phrase in phrases)
+
+
+def iter_semantic_scholar_bulk(
+    query: Union[str, list[str]],
+    max_results: Optional[int] = None,
+    min_citation_count: int = 0,
+    year_from: Optional[int] = None,
+    publication_date_from: Optional[str] = None
+) -> Iterator[PaperRecord]:
+    """
+    Stream Semantic Scholar bulk search results, following continuation tokens.
+
+    Uses /paper/search/bulk, which pages through every match (up to 1000
+    per request) instead of the relevance search's top 100. The citation
+    filter is applied by the server (minCitationCount) and results come
+    most cited first. Only one page of JSON is held at a time.
+
+    Args:
+        query: Bulk query syntax ("a" | "b", +, -), or a list of phrases to OR
+        max_results: Stop after this many papers (None for all)
+        min_citation_count: Minimum citation count filter
+        year_from: Only include papers from this year onwards
+        publication_date_from: Only papers published on/after this date (YYYY-MM-DD)
+
+    Yields:
+        PaperRecord objects, most cited first
+    """
+    base_url = "https://api.semanticscholar.org/graph/v1/paper/search/bulk"
+
+    params = {
+        "query": query if isinstance(query, str) else bulk_query(query),
+        "fields": SEARCH_FIELDS,
+        "sort": "citationCount:desc"
+    }
+    if min_citation_count > 0:
+        params["minCitationCount"] = min_citation_count
+    if year_from:
+        params["year"] = f"{year_from}-"
+    if publication_date_from:
+        params["publicationDateOrYear"] = f"{publication_date_from}:"
+
+    yielded = 0
+    token = None
+
+    while True:
+        if token:
+            params["token"] = token
+        url = f"{base_url}?{urllib.parse.urlencode(params)}"
+
+        try:
+            data = json.loads(cached_fetch(url, source="semantic_scholar", timeout=30).decode("utf-8"))
         except urllib.error.HTTPError as e:
-            if e.code == 429:
-                wait_time = 2 ** attempt * 30  # Exponential backoff: 30, 60, 120 seconds
-                print(f"Rate limited, waiting {wait_time}s (attempt {attempt + 1}/{max_retries})...")
-                time.sleep(wait_time)
-            else:
-                print(f"HTTP error from Semantic Scholar: {e}")
-                return papers
+            print(f"HTTP error from Semantic Scholar bulk search: {e}")
+            return
         except Exception as e:
-            print(f"Error fetching from Semantic Scholar: {e}")
-            return papers
+            print(f"Error fetching from Semantic Scholar bulk search: {e}")
+            return
 
-    return papers
+        results = data.get("data") or []
+        token = data.get("token") if results else None
+        del data
 
+        for item in results:
+            yield _parse_paper(item)
+            yielded += 1
+            if max_results is not None and yielded >= max_results:
+                return
 
-def get_citation_count(arxiv_id: str) -> Optional[int]:
+        if not token:
+            return
+
+
+def search_semantic_scholar_bulk(
+    query: Union[str, list[str]],
+    limit: Optional[int] = None,
+    min_citation_count: int = 0,
+    year_from: Optional[int] = None,
+    publication_date_from: Optional[str] = None
+) -> list[PaperRecord]:
     """
-    Get citation count for a paper by its arXiv ID.
+    Bulk-search Semantic Scholar (see iter_semantic_scholar_bulk).
+
+    Returns:
+        List of PaperRecord objects, most cited first
+    """
+    return list(iter_semantic_scholar_bulk(
+        query,
+        max_results=limit,
+        min_citation_count=min_citation_count,
+        year_from=year_from,
+        publication_date_from=publication_date_from
+    ))
+
+
+# Maximum number of IDs the /paper/batch endpoint accepts per request
+BATCH_MAX_IDS = 500
+
+
+def get_papers_batch(
+    arxiv_ids: list[str],
+    fields: list[str],
+    batch_size: int = BATCH_MAX_IDS
+) -> dict[str, dict]:
+    """
+    Look up many papers by arXiv ID via the /paper/batch endpoint.
+
+    Sends up to batch_size IDs per POST, so any rate-limit wait is paid
+    once per batch rather than per paper.
 
     Args:
-        arxiv_id: The arXiv ID (e.g., "2210.02747")
+        arxiv_ids: arXiv IDs (version suffixes are ignored)
+        fields: Semantic Scholar fields to return (e.g. ["citationCount", "venue"])
+        batch_size: IDs per request (API max is 500)
 
     Returns:
-        Citation count or None if not found
+        Dict mapping clean arXiv ID to the raw API record. IDs Semantic
+        Scholar does not know are absent.
     """
-    # Clean up arxiv ID (remove version suffix if present)
-    clean_id = arxiv_id.split("v")[0] if "v" in arxiv_id else arxiv_id
+    clean_ids = list(dict.fromkeys(filter(None, map(canonical_arxiv_id, arxiv_ids))))
+    results = {}
 
-    url = f"https://api.semanticscholar.org/graph/v1/paper/arXiv:{clean_id}?fields=citationCount,venue"
+    for start in range(0, len(clean_ids), min(batch_size, BATCH_MAX_IDS)):
+        batch = clean_ids[start:start + min(batch_size, BATCH_MAX_IDS)]
+        results.update(_fetch_batch(batch, fields))
 
-    try:
-        req = urllib.request.Request(url)
-        req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
+    return results
 
-        with urllib.request.urlopen(req, timeout=15) as response:
-            data = json.loads(response.read().decode("utf-8"))
-            return data.get("citationCount", 0)
 
+def _fetch_batch(clean_ids: list[str], fields: list[str]) -> dict[str, dict]:
+    """POST one batch of clean arXiv IDs to /paper/batch."""
+    url = f"https://api.semanticscholar.org/graph/v1/paper/batch?{urllib.parse.urlencode({'fields': ','.join(fields)})}"
+    body = json.dumps({"ids": [f"arXiv:{arxiv_id}" for arxiv_id in clean_ids]}).encode("utf-8")
+
+    try:
+        data = json.loads(cached_fetch(
+            url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            source="semantic_scholar",
+            timeout=30
+        ).decode("utf-8"))
     except urllib.error.HTTPError as e:
-        if e.code == 404:
-            return None
-        elif e.code == 429:
-            print("Rate limited, waiting...")
-            time.sleep(5)
-            return None
-        else:
-            print(f"HTTP error: {e}")
-            return None
+        print(f"HTTP error from Semantic Scholar batch ({len(clean_ids)} IDs): {e}")
+        return {}
     except Exception as e:
-        print(f"Error getting citation count: {e}")
+        print(f"Error fetching Semantic Scholar batch: {e}")
+        return {}
+
+    # Response is a list aligned with the requested IDs, null for misses
+    return {
+        arxiv_id: item
+        for arxiv_id, item in zip(clean_ids, data)
+        if item
+    }
+
+
+def get_citation_count(arxiv_id: str) -> Optional[int]:
+    """
+    Get citation count for a paper by its arXiv ID.
+
+    Args:
+        arxiv_id: The arXiv ID (e.g., "2210.02747")
+
+    Returns:
+        Citation count or None if not found
+    """
+    # Clean up arxiv ID (remove version suffix if present)
+    clean_id = canonical_arxiv_id(arxiv_id)
+
+    item = get_papers_batch([clean_id], ["citationCount", "venue"]).get(clean_id)
+    if item is None:
         return None
+    return item.get("citationCount", 0)
 
 
-def get_paper_details(arxiv_id: str, max_retries: int = 3) -> Optional[dict]:
+def get_paper_details(arxiv_id: str) -> Optional[dict]:
     """
     Get detailed paper info from Semantic Scholar by arXiv ID.
 
     Args:
         arxiv_id: The arXiv ID
-        max_retries: Maximum number of retries on rate limit
 
     Returns:
         Dict with citationCount and venue, or None if not found
     """
-    clean_id = arxiv_id.split("v")[0] if "v" in arxiv_id else arxiv_id
-    url = f"https://api.semanticscholar.org/graph/v1/paper/arXiv:{clean_id}?fields=citationCount,venue,publicationVenue"
+    clean_id = canonical_arxiv_id(arxiv_id)
 
-    for attempt in range(max_retries):
-        try:
-            req = urllib.request.Request(url)
-            req.add_header("User-Agent", "awesome-flow-matching-autoupdate/1.0")
+    item = get_papers_batch(
+        [clean_id],
+        ["citationCount", "venue", "publicationVenue"]
+    ).get(clean_id)
+    if item is None:
+        return None
 
-            with urllib.request.urlopen(req, timeout=15) as response:
-                data = json.loads(response.read().decode("utf-8"))
-                return {
-                    "citation_count": data.get("citationCount", 0) or 0,
-                    "venue": data.get("venue", "") or "",
-                    "publication_venue": data.get("publicationVenue", {})
-                }
+    return {
+        "citation_count": item.get("citationCount", 0) or 0,
+        "venue": item.get("venue", "") or "",
+        "publication_venue": item.get("publicationVenue", {})
+    }
 
-        except urllib.error.HTTPError as e:
-            if e.code == 429:
-                wait_time = 2 ** attempt * 5  # Exponential backoff: 5, 10, 20 seconds
-                print(f"Rate limited, waiting {wait_time}s (attempt {attempt + 1}/{max_retries})...")
-                time.sleep(wait_time)
-            elif e.code == 404:
-                return None
-            else:
-                return None
-        except Exception:
-            return None
-
-    return None
+
+async def search_semantic_scholar_async(*args, **kwargs) -> list[PaperRecord]:
+    """Async adapter for search_semantic_scholar, limited per Semantic Scholar host."""
+    return await run_blocking(API_HOST, search_semantic_scholar, *args, **kwargs)
+
+
+async def search_semantic_scholar_bulk_async(*args, **kwargs) -> list[PaperRecord]:
+    """Async adapter for search_semantic_scholar_bulk, limited per Semantic Scholar host."""
+    return await run_blocking(API_HOST, search_semantic_scholar_bulk, *args, **kwargs)
+
+
+async def get_citation_count_async(arxiv_id: str) -> Optional[int]:
+    """Async adapter for get_citation_count, limited per Semantic Scholar host."""
+    return await run_blocking(API_HOST, get_citation_count, arxiv_id)
+
+
+async def get_paper_details_async(arxiv_id: str) -> Optional[dict]:
+    """Async adapter for get_paper_details, limited per Semantic Scholar host."""
+    return await run_blocking(API_HOST, get_paper_details, arxiv_id)
+
+
+async def get_papers_batch_async(*args, **kwargs) -> dict[str, dict]:
+    """Async adapter for get_papers_batch, limited per Semantic Scholar host."""
+    return await run_blocking(API_HOST, get_papers_batch, *args, **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,430 @@
+"""SQLite paper store - the pipeline's system of record."""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+from readme_index import scan_readme
+from record import PaperRecord, canonical_arxiv_id
+
+# SQLite caps bound parameters per statement; stay well under the old 999 limit
+_LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    arxiv_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    authors TEXT NOT NULL DEFAULT '[]',
+    abstract TEXT NOT NULL DEFAULT '',
+    published_date TEXT,
+    updated_date TEXT,
+    publication_date TEXT NOT NULL DEFAULT '',
+    year INTEGER NOT NULL DEFAULT 0,
+    citation_count INTEGER NOT NULL DEFAULT 0,
+    venue TEXT NOT NULL DEFAULT '',
+    categories TEXT NOT NULL DEFAULT '[]',
+    doi TEXT NOT NULL DEFAULT '',
+    source TEXT NOT NULL DEFAULT '',
+    source_id TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    listed_at TEXT,
+    citations_checked_at TEXT,
+    citation_growth REAL NOT NULL DEFAULT 0,
+    matched_terms TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS papers_title_hash ON papers (title_hash);
+CREATE INDEX IF NOT EXISTS papers_year ON papers (year);
+CREATE INDEX IF NOT EXISTS papers_citation_count ON papers (citation_count);
+CREATE INDEX IF NOT EXISTS papers_category ON papers (category);
+CREATE INDEX IF NOT EXISTS papers_last_seen ON papers (last_seen);
+"""
+
+# Columns added after the first schema, created on stores that predate them
+_ADDED_COLUMNS = {
+    "citations_checked_at": "TEXT",
+    "citation_growth": "REAL NOT NULL DEFAULT 0",
+    "matched_terms": "TEXT NOT NULL DEFAULT '[]'",
+}
+
+# New values win, except that empty strings never overwrite stored data and
+# a paper keeps its category (and listing time) once it has been listed
+_UPSERT = """
+INSERT INTO papers (
+    arxiv_id, title, title_hash, authors, abstract, published_date, updated_date,
+    publication_date, year, citation_count, venue, categories, doi, source,
+    source_id, category, first_seen, last_seen, listed_at, matched_terms
+) VALUES (
+    :arxiv_id, :title, :title_hash, :authors, :abstract, :published_date, :updated_date,
+    :publication_date, :year, :citation_count, :venue, :categories, :doi, :source,
+    :source_id, :category, :seen, :seen, :listed_at, :matched_terms
+)
+ON CONFLICT (arxiv_id) DO UPDATE SET
+    title = excluded.title,
+    title_hash = excluded.title_hash,
+    authors = CASE WHEN excluded.authors != '[]' THEN excluded.authors ELSE papers.authors END,
+    abstract = CASE WHEN excluded.abstract != '' THEN excluded.abstract ELSE papers.abstract END,
+    published_date = COALESCE(excluded.published_date, papers.published_date),
+    updated_date = COALESCE(excluded.updated_date, papers.updated_date),
+    publication_date = CASE WHEN excluded.publication_date != '' THEN excluded.publication_date ELSE papers.publication_date END,
+    year = CASE WHEN excluded.year != 0 THEN excluded.year ELSE papers.year END,
+    citation_count = CASE WHEN excluded.citation_count != 0 THEN excluded.citation_count ELSE papers.citation_count END,
+    venue = CASE WHEN excluded.venue != '' THEN excluded.venue ELSE papers.venue END,
+    categories = CASE WHEN excluded.categories != '[]' THEN excluded.categories ELSE papers.categories END,
+    doi = CASE WHEN excluded.doi != '' THEN excluded.doi ELSE papers.doi END,
+    source = excluded.source,
+    source_id = CASE WHEN excluded.source_id != '' THEN excluded.source_id ELSE papers.source_id END,
+    category = CASE WHEN papers.category != '' THEN papers.category ELSE excluded.category END,
+    last_seen = excluded.last_seen,
+    listed_at = COALESCE(papers.listed_at, excluded.listed_at),
+    matched_terms = CASE WHEN excluded.matched_terms != '[]' THEN excluded.matched_terms ELSE papers.matched_terms END
+"""
+
+
+def title_hash(title: str) -> str:
+    """Hash of the normalized title (lowercased, whitespace collapsed)."""
+    normalized = " ".join(title.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CitationState:
+    """Last known citation count of a paper and when it was checked."""
+    citation_count: int
+    venue: str
+    checked_at: Optional[datetime]
+    growth_per_day: float
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class PaperStore:
+    """
+    Every candidate paper the pipeline has seen, keyed by canonical arXiv ID.
+
+    Papers with a category are the ones listed in the README; the README
+    is rendered from them. Other rows are candidates kept for their
+    metadata (e.g. papers already in the original list).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.row_factory = sqlite3.Row
+        self._migrate()
+
+    def _migrate(self) -> None:
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(papers)")}
+        if existing:
+            for column, definition in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE papers ADD COLUMN {column} {definition}")
+        self._conn.executescript(SCHEMA)
+
+    def __enter__(self) -> PaperStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # --- writes ---
+
+    def upsert_papers(self, papers: Iterable[PaperRecord], seen_at: Optional[datetime] = None) -> int:
+        """
+        Insert or update papers in one transaction.
+
+        Papers with a category are marked as listed. Fields left empty (or
+        zero) on a record keep their stored value.
+
+        Args:
+            papers: Records to store (records without an arXiv ID are skipped)
+            seen_at: Time to record as last_seen (defaults to now)
+
+        Returns:
+            Number of papers written
+        """
+        seen = (seen_at or datetime.utcnow()).isoformat(timespec="seconds")
+        rows = [
+            {
+                "arxiv_id": paper.arxiv_id,
+                "title": paper.title,
+                "title_hash": title_hash(paper.title),
+                "authors": json.dumps(list(paper.authors), ensure_ascii=False),
+                "abstract": paper.abstract,
+                "published_date": _isoformat(paper.published_date),
+                "updated_date": _isoformat(paper.updated_date),
+                "publication_date": paper.publication_date,
+                "year": paper.year,
+                "citation_count": paper.citation_count,
+                "venue": paper.venue,
+                "categories": json.dumps(list(paper.categories)),
+                "doi": paper.doi,
+                "source": paper.source,
+                "source_id": paper.source_id,
+                "category": paper.category,
+                "seen": seen,
+                "listed_at": seen if paper.category else None,
+                "matched_terms": json.dumps(list(paper.matched_terms), ensure_ascii=False)
+            }
+            for paper in papers
+            if paper.arxiv_id
+        ]
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def record_citation_checks(
+        self,
+        papers: Iterable[PaperRecord],
+        growth: dict[str, float],
+        checked_at: Optional[datetime] = None
+    ) -> None:
+        """
+        Store papers whose citation count was just looked up.
+
+        Args:
+            papers: Looked-up papers, with citation_count set to the new count
+                (0 if the lookup found nothing, which keeps the stored count)
+            growth: Estimated citations per day, by arXiv ID
+            checked_at: Time of the lookup (defaults to now)
+        """
+        papers = [p for p in papers if p.arxiv_id]
+        checked = (checked_at or datetime.utcnow()).isoformat(timespec="seconds")
+        self.upsert_papers(papers, checked_at)
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE papers SET citations_checked_at = ?, citation_growth = ? WHERE arxiv_id = ?",
+                [(checked, growth.get(p.arxiv_id, 0.0), p.arxiv_id) for p in papers]
+            )
+
+    # --- lookups ---
+
+    def count(self, listed_only: bool = False) -> int:
+        query = "SELECT COUNT(*) FROM papers" + (" WHERE category != ''" if listed_only else "")
+        return self._conn.execute(query).fetchone()[0]
+
+    def listed_ids(self, arxiv_ids: Iterable[str]) -> set[str]:
+        """Which of these (canonical) arXiv IDs are already listed."""
+        return self._lookup("arxiv_id", list(dict.fromkeys(arxiv_ids)))
+
+    def listed_title_hashes(self, titles: Iterable[str]) -> set[str]:
+        """Title hashes (see title_hash) of these titles that are already listed."""
+        return self._lookup("title_hash", list(dict.fromkeys(map(title_hash, titles))))
+
+    def _lookup(self, column: str, values: list[str]) -> set[str]:
+        found = set()
+        for start in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT {column} FROM papers WHERE category != '' AND {column} IN ({placeholders})",
+                chunk
+            ))
+        return found
+
+    def citation_states(self, arxiv_ids: Iterable[str]) -> dict[str, CitationState]:
+        """Stored citation state for these arXiv IDs (unknown IDs are absent)."""
+        values = list(dict.fromkeys(arxiv_ids))
+        states = {}
+        for start in range(0, len(values), _LOOKUP_CHUNK):
+            chunk = values[start:start + _LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._conn.execute(
+                "SELECT arxiv_id, citation_count, venue, citations_checked_at, citation_growth "
+                f"FROM papers WHERE arxiv_id IN ({placeholders})",
+                chunk
+            ):
+                states[row["arxiv_id"]] = CitationState(
+                    citation_count=row["citation_count"],
+                    venue=row["venue"],
+                    checked_at=_parse_datetime(row["citations_checked_at"]),
+                    growth_per_day=row["citation_growth"]
+                )
+        return states
+
+    def unlisted_below(self, min_citations: int, limit: Optional[int] = None) -> list[PaperRecord]:
+        """
+        Unlisted candidates whose last known count is below min_citations.
+
+        Least recently checked first (never-checked papers before all others).
+
+        Args:
+            min_citations: Inclusion threshold
+            limit: Maximum number of papers (None for all)
+        """
+        rows = self._conn.execute(
+            "SELECT * FROM papers WHERE category = '' AND arxiv_id != '' AND citation_count < ? "
+            "ORDER BY citations_checked_at IS NOT NULL, citations_checked_at, rowid LIMIT ?",
+            (min_citations, -1 if limit is None else limit)
+        )
+        return [self._to_record(row) for row in rows]
+
+    def unlisted_at_least(self, min_citations: int) -> list[PaperRecord]:
+        """
+        Unlisted candidates whose last known count meets min_citations.
+
+        These are papers an earlier run found but never listed: already in
+        the original list, or held back when detail fetching or
+        classification was cut short.
+        """
+        rows = self._conn.execute(
+            "SELECT * FROM papers WHERE category = '' AND arxiv_id != '' AND citation_count >= ? ORDER BY rowid",
+            (min_citations,)
+        )
+        return [self._to_record(row) for row in rows]
+
+    def listed_papers(self) -> list[PaperRecord]:
+        """Listed papers in the order they were added."""
+        rows = self._conn.execute("SELECT * FROM papers WHERE category != '' ORDER BY listed_at, rowid")
+        return [self._to_record(row) for row in rows]
+
+    def papers_by_category(self) -> dict[str, list[PaperRecord]]:
+        """Listed papers grouped by category, as generate_readme expects."""
+        grouped: dict[str, list[PaperRecord]] = {}
+        for paper in self.listed_papers():
+            grouped.setdefault(paper.category, []).append(paper)
+        return grouped
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> PaperRecord:
+        return PaperRecord(
+            title=row["title"],
+            arxiv_id=row["arxiv_id"],
+            authors=json.loads(row["authors"]),
+            abstract_text=row["abstract"],
+            published_date=_parse_datetime(row["published_date"]),
+            updated_date=_parse_datetime(row["updated_date"]),
+            publication_date=row["publication_date"],
+            year=row["year"],
+            citation_count=row["citation_count"],
+            venue=row["venue"],
+            categories=json.loads(row["categories"]),
+            doi=row["doi"],
+            source=row["source"],
+            source_id=row["source_id"],
+            category=row["category"],
+            matched_terms=json.loads(row["matched_terms"])
+        )
+
+    # --- bootstrap ---
+
+    def bootstrap_from_readme(self, content: str) -> int:
+        """
+        Seed an empty store with the papers listed in a rendered README.
+
+        Returns:
+            Number of papers imported (0 if the store already has listed papers)
+        """
+        if self.count(listed_only=True):
+            return 0
+        papers = parse_readme_entries(content)
+        return self.upsert_papers(papers)
+
+
+_ENTRY_LINE = re.compile(
+    r'^(?P<venue>.*?)(?: (?P<year>\d{4}))?\.(?: \(cited: (?P<cited>\d+)\))? \[\[Paper\]\((?P<url>[^)]+)\)\]\\?$'
+)
+
+
+def parse_readme_entries(content: str) -> list[PaperRecord]:
+    """
+    Parse the entries of a README rendered by formatter.generate_readme.
+
+    Each entry is a bold title line, an italic author line, a venue/link
+    line and a date line, under a "## Category" heading.
+
+    Returns:
+        PaperRecord objects with their category set, in README order
+    """
+    papers = []
+    index = scan_readme(content)
+
+    for entry in index.entries:
+        if not entry.section:
+            continue
+        lines = index.text(entry).split("\n")
+        if not lines[0].rstrip("\\").endswith("**"):
+            continue
+
+        title = entry.title
+        author_line = lines[1].rstrip("\\") if len(lines) > 1 else ""
+        match = _ENTRY_LINE.match(lines[2]) if len(lines) > 2 else None
+        if not match or not author_line.startswith("*"):
+            continue
+
+        # The README keeps five authors plus "et al."; the marker is kept as
+        # the last author so the entry renders the same way again
+        authors = [a.strip() for a in author_line.strip("*").split(", ") if a.strip()]
+
+        published_date = None
+        if len(lines) > 3:
+            try:
+                published_date = datetime.strptime(lines[3].strip(), "%d %b %Y")
+            except ValueError:
+                pass
+
+        venue = match.group("venue")
+        papers.append(PaperRecord(
+            title=title,
+            arxiv_id=canonical_arxiv_id(match.group("url")),
+            authors=authors,
+            published_date=published_date,
+            year=int(match.group("year") or 0),
+            citation_count=int(match.group("cited") or 0),
+            venue="" if venue == "arXiv" else venue,
+            source="readme",
+            category=entry.section
+        ))
+
+    return papers
+
+
+def open_store(path: Union[str, Path], readme_path: Optional[Union[str, Path]] = None) -> PaperStore:
+    """
+    Open the paper store, seeding it from readme_path the first time.
+
+    Args:
+        path: SQLite database file
+        readme_path: Rendered README to import if the store has no listed papers
+
+    Returns:
+        PaperStore
+    """
+    store = PaperStore(path)
+    if readme_path and not store.count(listed_only=True):
+        try:
+            with open(readme_path) as f:
+                imported = store.bootstrap_from_readme(f.read())
+        except FileNotFoundError:
+            imported = 0
+        if imported:
+            print(f"Seeded paper store with {imported} papers from {readme_path}")
+    return store
+
+
+if __name__ == "__main__":
+    # Test: seed an in-memory store from the local README
+    readme = Path(__file__).parent.parent / "README.md"
+    with open_store(":memory:", readme) as store:
+        print(f"{store.count(listed_only=True)} listed papers")
+        for category, papers in store.papers_by_category().items():
+            print(f"  {category}: {len(papers)}")
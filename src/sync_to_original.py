@@ -3,44 +3,41 @@
 from __future__ import annotations
 
 import os
-import re
 import subprocess
 import sys
 from pathlib import Path
 
+from readme_index import ReadmeIndex, scan_readme
 
-def get_existing_arxiv_ids(readme_path: str) -> set[str]:
-    """Extract arXiv IDs from a README file."""
-    with open(readme_path, 'r') as f:
-        content = f.read()
-    return set(re.findall(r'arxiv\.org/abs/(\d{4}\.\d{4,5})', content))
+
+# Sections of the auto-update README that are copied to the original list
+VALID_SECTIONS = ['Foundational', 'Theory', 'Schrödinger Bridge', 'Discrete Data', 'Accelerating', 'Applications']
 
 
-def extract_papers_by_section(readme_path: str) -> dict[str, list[str]]:
-    """Extract papers grouped by section from auto-update README."""
-    with open(readme_path, 'r') as f:
-        content = f.read()
+def load_readme_index(readme_path: str) -> ReadmeIndex:
+    """Scan a README file once."""
+    with open(readme_path, 'rb') as f:
+        return scan_readme(f.read())
 
-    sections = {}
-    current_section = None
-    current_papers = []
-    valid_sections = ['Foundational', 'Theory', 'Schrödinger Bridge', 'Discrete Data', 'Accelerating', 'Applications']
 
-    for line in content.split('\n'):
-        if line.startswith('## ') and line[3:].strip() in valid_sections:
-            if current_section and current_papers:
-                sections[current_section] = current_papers
-            current_section = line[3:].strip()
-            current_papers = []
-        elif current_section and line.startswith('**'):
-            current_papers.append(line)
-        elif current_section and current_papers and line.strip():
-            current_papers[-1] += '\n' + line
+def get_existing_arxiv_ids(readme_path: str) -> set[str]:
+    """Extract arXiv IDs from a README file."""
+    return load_readme_index(readme_path).arxiv_ids
+
 
-    if current_section and current_papers:
-        sections[current_section] = current_papers
+def extract_papers_by_section(readme_path: str) -> dict[str, list[tuple[str, str]]]:
+    """
+    Extract papers grouped by section from auto-update README.
 
-    return sections
+    Returns:
+        Dict mapping section name to (arXiv ID, entry markdown) pairs
+    """
+    index = load_readme_index(readme_path)
+    return {
+        section: [(entry.arxiv_id, index.text(entry)) for entry in entries]
+        for section, entries in index.sections().items()
+        if section in VALID_SECTIONS
+    }
 
 
 def main():
@@ -75,9 +72,8 @@ def main():
 
     for section, papers in sections.items():
         new_papers = []
-        for paper in papers:
-            match = re.search(r'arxiv\.org/abs/(\d{4}\.\d{4,5})', paper)
-            if match and match.group(1) not in existing_ids:
+        for arxiv_id, paper in papers:
+            if arxiv_id and arxiv_id not in existing_ids:
                 new_papers.append(paper)
         if new_papers:
             new_papers_by_section[section] = new_papers
@@ -0,0 +1,218 @@
+"""Near-duplicate title index - character n-gram signatures with prefix filtering."""
+from __future__ import annotations
+
+import itertools
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable, Optional
+
+# Minimum Jaccard similarity of two titles' n-gram sets to count as the same paper
+DEFAULT_THRESHOLD = 0.8
+
+NGRAM = 3
+
+# A colon clause is only dropped if what is left is a specific title on its
+# own: at least this many words and canonical characters. Short heads name a
+# topic, not a paper ("Consistency Models: A Survey", "Rectified Flow: A
+# Marginal Preserving Approach to Optimal Transport" are not "Consistency
+# Models" or "Rectified Flow").
+MIN_HEAD_WORDS = 5
+MIN_HEAD_CHARS = 30
+
+# LaTeX commands that only format their argument; other commands (\alpha) keep their name
+_FORMAT_COMMANDS = re.compile(r"\\(?:math[a-z]*|text[a-z]*|emph|bf|it|rm|operatorname|left|right)\b")
+_LATEX_COMMAND = re.compile(r"\\([a-zA-Z]+)")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def canonical_title(title: str) -> str:
+    """
+    Title reduced to lowercase letters and digits.
+
+    Accents, LaTeX markup, punctuation, hyphens and whitespace are dropped,
+    so "Flow-Matching for $\\mathcal{O}(1)$ Sampling" and
+    "Flow matching for O(1) sampling" give the same string.
+    """
+    text = title
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _LATEX_COMMAND.sub(r"\1", _FORMAT_COMMANDS.sub("", text))
+    return _NON_ALNUM.sub("", text.lower())
+
+
+def title_head(title: str) -> str:
+    """Canonical title without its trailing colon clause ("" if there is none or the rest is too generic)."""
+    head, sep, _ = title.partition(":")
+    if not sep or len(head.replace("-", " ").split()) < MIN_HEAD_WORDS:
+        return ""
+    head = canonical_title(head)
+    return head if len(head) >= MIN_HEAD_CHARS else ""
+
+
+def ngrams(text: str, n: int = NGRAM) -> frozenset[str]:
+    """Set of character n-grams (the whole string if it is shorter than n)."""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+class TitleIndex:
+    """
+    Answers "is this title a near-duplicate of one already listed?".
+
+    Titles are compared by the Jaccard similarity of their character
+    n-gram sets (after canonical_title), which absorbs punctuation, LaTeX
+    and hyphenation differences. A title that adds or drops a trailing
+    colon clause also matches, by comparing its head with the other's
+    full title, but only when that head is long enough to identify a
+    paper by itself (see MIN_HEAD_WORDS).
+
+    Lookups use prefix filtering: n-grams are put in one fixed order
+    (rarest first) and each title is indexed under only the first
+    |x| - ceil(threshold * |x|) + 1 of them. Any two sets with Jaccard >=
+    threshold share one of those prefix n-grams, so only titles in a few
+    short posting lists are verified (after a size filter), with no false
+    negatives.
+    """
+
+    def __init__(self, titles: Iterable[str] = (), threshold: float = DEFAULT_THRESHOLD):
+        """
+        Args:
+            titles: Titles to index (raw or already normalized)
+            threshold: Minimum Jaccard similarity for a match, in (0, 1]
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self._titles: list[str] = []
+        self._grams: list[frozenset[str]] = []
+        # Posting lists for full titles and for titles' heads (colon clause dropped)
+        self._full: dict[str, list[int]] = {}
+        self._heads: dict[str, list[int]] = {}
+        self._head_grams: dict[int, frozenset[str]] = {}
+
+        titles = list(titles)
+        grams = [ngrams(canonical_title(title)) for title in titles]
+
+        # The global order: n-grams ranked by how many titles contain them
+        # (ties by the n-gram itself). Ranks never change once given out;
+        # n-grams first seen later are ranked rarest of all.
+        frequency = Counter(itertools.chain.from_iterable(grams))
+        self._rank = {gram: rank for rank, gram in enumerate(sorted(frequency, key=lambda g: (frequency[g], g)))}
+
+        for title, title_grams in zip(titles, grams):
+            self._add(title, title_grams)
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def __contains__(self, title: str) -> bool:
+        return self.find(title) is not None
+
+    def add(self, title: str) -> None:
+        """Index one more title."""
+        grams = ngrams(canonical_title(title))
+        for gram in grams:
+            if gram not in self._rank:
+                self._rank[gram] = -len(self._rank)
+        self._add(title, grams)
+
+    def _add(self, title: str, grams: frozenset[str]) -> None:
+        if not grams:
+            return
+        entry = len(self._titles)
+        self._titles.append(title)
+        self._grams.append(grams)
+        self._post(self._full, entry, grams)
+
+        head = ngrams(title_head(title))
+        if head:
+            self._head_grams[entry] = head
+            self._post(self._heads, entry, head)
+
+    def find(self, title: str) -> Optional[str]:
+        """
+        Return the most similar indexed title at or above the threshold.
+
+        Args:
+            title: Title to look up
+
+        Returns:
+            The indexed title as it was added, or None
+        """
+        grams = ngrams(canonical_title(title))
+        if not grams:
+            return None
+
+        best, best_score = None, 0.0
+        checks = [(grams, self._full, self._grams.__getitem__)]
+        head = ngrams(title_head(title))
+        if head:
+            # Our title minus its colon clause vs. their full title
+            checks.append((head, self._full, self._grams.__getitem__))
+        # Our full title vs. their title minus its colon clause
+        checks.append((grams, self._heads, self._head_grams.__getitem__))
+
+        for query, postings, grams_of in checks:
+            for entry in self._candidates(query, postings):
+                other = grams_of(entry)
+                # Jaccard can be at most min/max of the set sizes
+                if min(len(query), len(other)) < self.threshold * max(len(query), len(other)):
+                    continue
+                score = _jaccard(query, other)
+                if score >= self.threshold and score > best_score:
+                    best, best_score = entry, score
+                    if score == 1.0:
+                        return self._titles[entry]
+
+        return self._titles[best] if best is not None else None
+
+    def _order(self, grams: frozenset[str]) -> list[str]:
+        # N-grams no indexed title has cannot produce candidates; putting them
+        # first (in any order) keeps the prefix guarantee for the known ones
+        rank = self._rank
+        known = [g for g in grams if g in rank]
+        unknown = [g for g in grams if g not in rank] if len(known) < len(grams) else []
+        return unknown + sorted(known, key=rank.__getitem__)
+
+    def _prefix_length(self, size: int) -> int:
+        return size - math.ceil(self.threshold * size - 1e-9) + 1
+
+    def _post(self, postings: dict[str, list[int]], entry: int, grams: frozenset[str]) -> None:
+        for gram in self._order(grams)[:self._prefix_length(len(grams))]:
+            postings.setdefault(gram, []).append(entry)
+
+    def _candidates(self, grams: frozenset[str], postings: dict[str, list[int]]) -> set[int]:
+        candidates = set()
+        for gram in self._order(grams)[:self._prefix_length(len(grams))]:
+            entries = postings.get(gram)
+            if entries:
+                candidates.update(entries)
+        return candidates
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+if __name__ == "__main__":
+    # Test near-duplicate lookups
+    index = TitleIndex([
+        "Flow Matching for Generative Modeling",
+        "Stochastic Interpolants: A Unifying Framework for Flows and Diffusions",
+        "Rectified Flow",
+        "Consistency Models",
+    ])
+    for query in [
+        "Flow-Matching for Generative Modelling.",
+        "Stochastic interpolants",  # Different: too short a head to stand for the paper
+        "Flow Matching for Generative Modeling: Extended Version",
+        "Rectified Flow: A Marginal Preserving Approach to Optimal Transport",  # Different paper
+        "Consistency Models: A Survey",  # Different paper
+        "Conditional Flow Matching",
+    ]:
+        print(f"{query!r} -> {index.find(query)!r}")
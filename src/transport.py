@@ -0,0 +1,398 @@
+"""Shared HTTP transport with persistent per-host keep-alive connection pools."""
+from __future__ import annotations
+
+import http.client
+import io
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.parse
+import zlib
+from typing import Optional
+
+from rate_control import get_controller, parse_retry_after
+from run_budget import get_budget
+from shared_quota import get_bucket
+
+USER_AGENT = "awesome-flow-matching-autoupdate/1.0"
+DEFAULT_TIMEOUT = 30
+
+# Idle connections kept per host
+MAX_IDLE_PER_HOST = 4
+
+MAX_REDIRECTS = 5
+
+# 429/503 responses retried after waiting as the rate controller (and Retry-After) says
+MAX_THROTTLE_RETRIES = 3
+
+_THROTTLE_STATUSES = (429, 503)
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+_CHUNK_SIZE = 64 * 1024
+
+# Errors that mean a pooled connection was closed by the server while idle
+_STALE_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError, http.client.BadStatusLine)
+
+_ssl_context = ssl.create_default_context()
+
+
+class ConnectionPool:
+    """Idle keep-alive connections for one scheme://host:port."""
+
+    def __init__(self, scheme: str, host: str, port: Optional[int], max_idle: int = MAX_IDLE_PER_HOST):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.max_idle = max_idle
+        self.opened = 0
+        self.reused = 0
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused). Reuses an idle connection when one is available."""
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                self.reused += 1
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                conn.timeout = timeout
+                return conn, True
+        return self.open_new(timeout), False
+
+    def open_new(self, timeout: float) -> http.client.HTTPConnection:
+        """Open a fresh connection, bypassing idle ones."""
+        with self._lock:
+            self.opened += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=_ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        """Return a connection whose last response was fully read."""
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class _Decoder:
+    """Streaming gzip/deflate decoder (deflate may be zlib-wrapped or raw)."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self._first = True
+        wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+        self._obj = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._first and self.encoding == "deflate":
+            self._first = False
+            try:
+                return self._obj.decompress(data)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class PooledResponse(io.RawIOBase):
+    """
+    Readable response body that hands its connection back to the pool.
+
+    gzip/deflate bodies are decoded on the fly. Bytes on the wire and
+    decoded bytes are added to the transfer stats for `source`.
+
+    The connection is reused only if the body was read to the end and the
+    server did not ask to close it.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        response: http.client.HTTPResponse,
+        conn: http.client.HTTPConnection,
+        pool: ConnectionPool,
+        source: str
+    ):
+        super().__init__()
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self._response = response
+        self._conn = conn
+        self._pool = pool
+        self._source = source
+        # Decoded bytes not yet read start at _offset; the consumed front is
+        # only cut off once it outgrows the rest, so each byte is copied O(1) times
+        self._buffer = bytearray()
+        self._offset = 0
+        self._eof = False
+
+        encoding = (response.headers.get("Content-Encoding") or "").strip().lower()
+        self._decoder = _Decoder(encoding) if encoding in ("gzip", "deflate") else None
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = len(buffer)
+        self._fill(size)
+        count = min(size, len(self._buffer) - self._offset)
+        buffer[:count] = self._buffer[self._offset:self._offset + count]
+        self._consume(count)
+        return count
+
+    def _fill(self, size: int) -> None:
+        """Decode raw chunks until the buffer holds size unread bytes (or all of them if size < 0)."""
+        while not self._eof and (size < 0 or len(self._buffer) - self._offset < size):
+            wanted = size - (len(self._buffer) - self._offset)
+            chunk = self._response.read(_CHUNK_SIZE if self._decoder or size < 0 else wanted)
+            wire = len(chunk)
+            if not chunk:
+                self._eof = True
+                decoded = self._decoder.flush() if self._decoder else b""
+            else:
+                decoded = self._decoder.decompress(chunk) if self._decoder else chunk
+            _count_transfer(self._source, wire, len(decoded))
+            self._buffer += decoded
+
+    def _consume(self, count: int) -> None:
+        self._offset += count
+        if self._offset == len(self._buffer):
+            self._buffer.clear()
+            self._offset = 0
+        elif self._offset > len(self._buffer) // 2:
+            del self._buffer[:self._offset]
+            self._offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            self._fill(-1)
+            size = len(self._buffer) - self._offset
+        else:
+            self._fill(size)
+        data = bytes(self._buffer[self._offset:self._offset + size])
+        self._consume(len(data))
+        return data
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool.release(self._conn)
+        else:
+            self._response.close()
+            self._conn.close()
+        super().close()
+
+
+_pools: dict[tuple[str, str, Optional[int]], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+_transfer: dict[str, dict[str, int]] = {}
+_transfer_lock = threading.Lock()
+
+
+def _count_transfer(source: str, wire: int, decoded: int) -> None:
+    with _transfer_lock:
+        counts = _transfer.setdefault(source, {"wire": 0, "decoded": 0})
+        counts["wire"] += wire
+        counts["decoded"] += decoded
+
+
+def _get_pool(scheme: str, host: str, port: Optional[int]) -> ConnectionPool:
+    key = (scheme, host, port)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(scheme, host, port)
+        return _pools[key]
+
+
+def _send_once(
+    url: str,
+    method: str,
+    body: Optional[bytes],
+    headers: dict[str, str],
+    timeout: float,
+    source: Optional[str]
+) -> PooledResponse:
+    parts = urllib.parse.urlsplit(url)
+    pool = _get_pool(parts.scheme, parts.hostname, parts.port)
+    path = parts.path or "/"
+    if parts.query:
+        path += f"?{parts.query}"
+
+    conn, reused = pool.acquire(timeout)
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+    except _STALE_ERRORS:
+        conn.close()
+        if not reused:
+            raise
+        # The idle connection had gone away; retry once on a fresh one
+        conn = pool.open_new(timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+        except BaseException:
+            conn.close()
+            raise
+    except BaseException:
+        conn.close()
+        raise
+
+    return PooledResponse(url, response, conn, pool, source or parts.hostname)
+
+
+def _send_paced(
+    url: str,
+    method: str,
+    body: Optional[bytes],
+    headers: dict[str, str],
+    timeout: float,
+    source: Optional[str]
+) -> PooledResponse:
+    """
+    Send through the run budget, the host's rate controller and its shared quota.
+
+    Throttled responses are retried, and their Retry-After is applied to the
+    shared quota so other processes back off as well.
+    """
+    host = urllib.parse.urlsplit(url).hostname
+    controller = get_controller(host)
+    bucket = get_bucket(host)
+    budget = get_budget()
+
+    key = source or host
+    retries = 0
+    while True:
+        if not budget.allows(key):
+            budget.charge(key)  # Records the refusal and raises, before any pacing wait
+        controller.acquire()
+        try:
+            if bucket:
+                bucket.acquire()
+            # Charged only once pacing let the request through (an open circuit or a
+            # quota wait that gives up never reaches the wire); this also refuses it
+            # if the pacing wait ran past the deadline
+            budget.charge(key)
+        except urllib.error.URLError:
+            # Never sent, so no outcome: a half-open trial must not stay pending
+            controller.cancel()
+            raise
+        started = time.monotonic()
+        try:
+            response = _send_once(url, method, body, headers, budget.timeout(timeout), source)
+        except (OSError, http.client.HTTPException):
+            controller.record_failure()
+            raise
+
+        if response.status in _THROTTLE_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            controller.record_throttle(retry_after)
+            if bucket:
+                bucket.penalize(retry_after)
+            if retries < MAX_THROTTLE_RETRIES:
+                retries += 1
+                response.read()
+                response.close()
+                continue
+        elif response.status >= 500:
+            controller.record_failure()
+        else:
+            controller.record_success(time.monotonic() - started)
+        return response
+
+
+def request(
+    url: str,
+    data: Optional[bytes] = None,
+    headers: Optional[dict[str, str]] = None,
+    method: Optional[str] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    source: Optional[str] = None
+) -> PooledResponse:
+    """
+    Send a request over a pooled keep-alive connection.
+
+    Behaves like urllib.request.urlopen: follows redirects, adds the
+    shared User-Agent, and raises urllib.error.HTTPError for 3xx/4xx/5xx
+    responses it does not follow (including 304). Asks for gzip/deflate
+    and decodes the body transparently while it is read.
+
+    Requests are paced by the host's rate_control controller; 429/503
+    responses are retried after the delay it (or Retry-After) asks for,
+    and a host whose circuit is open raises rate_control.CircuitOpenError.
+    Each request is charged to the run budget under `source`, and raises
+    run_budget.BudgetExceededError once the deadline or budget is used up.
+
+    Args:
+        url: Absolute http(s) URL
+        data: Request body (implies POST)
+        headers: Extra request headers
+        method: HTTP method (defaults to GET, or POST with data)
+        timeout: Socket timeout in seconds
+        source: Name to account transfer bytes under (defaults to the host)
+
+    Returns:
+        PooledResponse; close it (or use it as a context manager) when done
+    """
+    method = method or ("POST" if data is not None else "GET")
+    request_headers = {"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING, **(headers or {})}
+
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _send_paced(url, method, data, request_headers, timeout, source)
+
+        if response.status in (301, 302, 303, 307, 308) and response.headers.get("Location"):
+            response.read()
+            response.close()
+            url = urllib.parse.urljoin(url, response.headers["Location"])
+            if response.status == 303:
+                method, data = "GET", None
+            continue
+
+        if response.status >= 300:
+            body = response.read()
+            response.close()
+            raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(body))
+
+        return response
+
+    raise urllib.error.HTTPError(url, 310, "Too many redirects", None, None)
+
+
+def transport_stats() -> dict[str, dict[str, int]]:
+    """Connections opened versus reused, per host."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.host: {"opened": pool.opened, "reused": pool.reused} for pool in pools}
+
+
+def transfer_stats() -> dict[str, dict[str, int]]:
+    """Bytes on the wire versus decoded body bytes, per source."""
+    with _transfer_lock:
+        return {source: dict(counts) for source, counts in _transfer.items()}
+
+
+def close_all() -> None:
+    """Close every idle pooled connection."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,116 @@
+"""Per-source high-water marks so each run only asks for newer records."""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, Union
+
+
+class Watermarks:
+    """
+    Last submitted/updated date seen per source, persisted as JSON.
+
+    Marks only advance to dates actually observed in results, so a source
+    that failed or returned nothing keeps its previous mark.
+
+    A source without a mark is harvested in date windows; the windows that
+    finished are kept (under "_history" in the same file) even when the
+    run was partial, so an interrupted history harvest resumes where it
+    stopped. They are dropped once the source has a mark.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        marks: Optional[dict[str, str]] = None,
+        full_rescan: bool = False,
+        overlap_days: int = 0,
+        history: Optional[dict[str, list[str]]] = None
+    ):
+        self.path = Path(path)
+        self.marks = dict(marks or {})
+        self._loaded = dict(self.marks)
+        self.full_rescan = full_rescan
+        self.overlap_days = overlap_days
+        self.history = {source: set(days) for source, days in (history or {}).items()}
+
+    def since(self, source: str) -> Optional[datetime]:
+        """
+        Start date for the next incremental query of a source.
+
+        Returns None (fetch everything) on a full rescan or when the source
+        has no mark yet. Otherwise returns the mark minus overlap_days, which
+        catches records indexed late.
+        """
+        if self.full_rescan or source not in self.marks:
+            return None
+        return datetime.fromisoformat(self.marks[source]) - timedelta(days=self.overlap_days)
+
+    def observe(self, source: str, seen: Union[datetime, str, None]) -> None:
+        """Advance a source's mark if `seen` is newer than it."""
+        if not seen:
+            return
+        if isinstance(seen, str):
+            seen = datetime.fromisoformat(seen.replace("Z", "+00:00"))
+        day = seen.date().isoformat()
+        if day > self.marks.get(source, ""):
+            self.marks[source] = day
+
+    def history_done(self, source: str) -> set[str]:
+        """Start dates (YYYY-MM-DD) of the source's history windows that finished in earlier runs."""
+        return set(self.history.get(source, ()))
+
+    def complete_window(self, source: str, start: Union[datetime, str]) -> None:
+        """Record that a history window (by its start date) was harvested in full."""
+        day = start.date().isoformat() if isinstance(start, datetime) else start
+        self.history.setdefault(source, set()).add(day)
+
+    def hold(self, source: str) -> None:
+        """Undo this run's advance of a source's mark (e.g. its fetch was cut short)."""
+        if source in self._loaded:
+            self.marks[source] = self._loaded[source]
+        else:
+            self.marks.pop(source, None)
+
+    def save(self) -> None:
+        """Write the marks to disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = dict(self.marks)
+        history = {source: sorted(days) for source, days in self.history.items() if days and source not in self.marks}
+        if history:
+            data["_history"] = history
+        with open(self.path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+def load_watermarks(
+    path: Union[str, Path],
+    full_rescan: bool = False,
+    overlap_days: int = 0
+) -> Watermarks:
+    """
+    Load watermarks from disk.
+
+    Args:
+        path: JSON file holding {source: "YYYY-MM-DD"} (and "_history")
+        full_rescan: Ignore stored marks and history progress and fetch everything
+        overlap_days: Days to re-fetch before each mark
+
+    Returns:
+        Watermarks (empty if the file does not exist yet)
+    """
+    try:
+        with open(path) as f:
+            marks = json.load(f)
+    except FileNotFoundError:
+        marks = {}
+    history = marks.pop("_history", {})
+    return Watermarks(
+        path,
+        marks,
+        full_rescan=full_rescan,
+        overlap_days=overlap_days,
+        history=None if full_rescan else history
+    )
@@ -38,24 +38,15 @@ def main():
         papers = search_openalex(term, limit=100, min_citation_count=min_citations, year_from=2020)
         print(f"    Found {len(papers)} papers")
 
-        for p in papers:
-            if p.arxiv_id:
-                all_papers.append({
-                    "arxiv_id": p.arxiv_id.split("v")[0],
-                    "title": p.title,
-                    "authors": p.authors,
-                    "abstract": p.abstract,
-                    "citation_count": p.citation_count,
-                    "venue": p.venue
-                })
+        all_papers.extend(p for p in papers if p.arxiv_id)
         time.sleep(0.5)  # Be polite
 
     # Dedupe
     seen = set()
     unique_papers = []
     for p in all_papers:
-        if p["arxiv_id"] not in seen:
-            seen.add(p["arxiv_id"])
+        if p.arxiv_id not in seen:
+            seen.add(p.arxiv_id)
             unique_papers.append(p)
 
     print(f"\n  Total unique papers with {min_citations}+ citations: {len(unique_papers)}")
@@ -64,10 +55,10 @@ def main():
     print("\n[Step 3] Filtering papers already in original repo...")
     new_papers = []
     for p in unique_papers:
-        if not is_duplicate(p["arxiv_id"], p["title"], existing_ids, existing_titles):
+        if not is_duplicate(p.arxiv_id, p.title, existing_ids, existing_titles):
             new_papers.append(p)
         else:
-            print(f"  [SKIP] {p['title'][:50]}... (already in repo)")
+            print(f"  [SKIP] {p.title[:50]}... (already in repo)")
 
     print(f"\n  New papers not in original repo: {len(new_papers)}")
 
@@ -77,12 +68,12 @@ def main():
     print("=" * 70)
 
     # Sort by citation count
-    new_papers.sort(key=lambda x: x["citation_count"], reverse=True)
+    new_papers.sort(key=lambda x: x.citation_count, reverse=True)
 
     for i, p in enumerate(new_papers[:15]):
-        print(f"\n{i+1}. {p['title']}")
-        print(f"   Citations: {p['citation_count']}, Venue: {p['venue'] or 'arXiv'}")
-        print(f"   arXiv: https://arxiv.org/abs/{p['arxiv_id']}")
+        print(f"\n{i+1}. {p.title}")
+        print(f"   Citations: {p.citation_count}, Venue: {p.venue or 'arXiv'}")
+        print(f"   arXiv: {p.arxiv_url}")
 
     # 5. Show formatted output sample
     if new_papers:
@@ -91,11 +82,11 @@ def main():
         print("=" * 70)
         sample = new_papers[0]
         formatted = format_paper_entry(
-            title=sample["title"],
-            authors=sample["authors"],
-            arxiv_id=sample["arxiv_id"],
-            venue=sample["venue"],
-            citation_count=sample["citation_count"]
+            title=sample.title,
+            authors=sample.authors,
+            arxiv_id=sample.arxiv_id,
+            venue=sample.venue,
+            citation_count=sample.citation_count
         )
         print(formatted)
 